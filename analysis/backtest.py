@@ -0,0 +1,142 @@
+"""Walk-forward backtesting of portfolio strategies"""
+
+import numpy as np
+import pandas as pd
+from analysis.moments import RunningMoments
+from analysis.optimizer import PortfolioOptimizer
+from analysis.panel import as_returns_panel
+from config.settings import RISK_FREE_RATE
+from utils.profiler import profiled
+
+
+def _drawdown(equity):
+    '''drawdown of an equity curve from its running peak'''
+
+    peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+    return equity / peak - 1.0
+
+
+@profiled()
+def walk_forward_backtest(
+    daily_returns,
+    strategy="sharpe",
+    lookback=252,
+    rebalance_every=21,
+    window="rolling",
+    risk_free_rate=RISK_FREE_RATE,
+    transaction_cost=0.0,
+    method="qp",
+):
+    """
+    Walk-forward out-of-sample backtest.
+
+    Every `rebalance_every` days the strategy is re-fit on the trailing
+    `lookback` days ("rolling") or on all history so far ("expanding"),
+    and the resulting weights are held (drifting with prices) until the
+    next rebalance. Window moments are updated incrementally and each
+    optimization is warm-started from the previous weights.
+
+    Parameters:
+        strategy: "sharpe" (max Sharpe) or "equal" (equal weight)
+        transaction_cost: cost per unit of turnover, charged on rebalance days
+        method: optimize_sharpe() method ("qp" or "slsqp")
+
+    Returns dict of numpy arrays:
+    - dates: out-of-sample dates
+    - returns: daily portfolio returns (net of costs)
+    - equity: cumulative growth of 1
+    - drawdown: drawdown from running peak
+    - rebalance_dates, turnover, weights (n_rebalances x n_assets)
+    - tickers, lookback
+    """
+
+    if strategy not in ("sharpe", "equal"):
+        raise ValueError(f"Unknown strategy: {strategy}")
+    if window not in ("rolling", "expanding"):
+        raise ValueError(f"Unknown window: {window}")
+
+    # Portfolio returns need every ticker on every day
+    panel = as_returns_panel(daily_returns).complete()
+    values = panel.values
+    tickers = panel.tickers
+    n_days, n_assets = values.shape
+
+    if n_days <= lookback:
+        raise ValueError("Not enough history for the lookback window.")
+
+    moments = RunningMoments(tickers).update(values[:lookback])
+    window_start = 0
+
+    pf_returns = np.empty(n_days - lookback)
+    rebalance_days = list(range(lookback, n_days, rebalance_every))
+    turnover = np.empty(len(rebalance_days))
+    weight_history = np.empty((len(rebalance_days), n_assets))
+
+    held = np.zeros(n_assets)
+    prev_opt = None
+
+    for r, day in enumerate(rebalance_days):
+        # Bring the estimation window up to (but excluding) this day
+        end_prev = rebalance_days[r - 1] if r else lookback
+        if day > end_prev:
+            moments.update(values[end_prev:day])
+        if window == "rolling" and day - lookback > window_start:
+            moments.remove(values[window_start:day - lookback])
+            window_start = day - lookback
+
+        if strategy == "equal":
+            target = np.full(n_assets, 1.0 / n_assets)
+        else:
+            optimizer = PortfolioOptimizer.from_moments(
+                moments.mean, moments.cov(), tickers, risk_free_rate
+            )
+            result = optimizer.optimize_sharpe(method=method, initial_weights=prev_opt)
+            target = optimizer.last_weights
+            if result["optimization_success"]:
+                prev_opt = target
+
+        turnover[r] = np.abs(target - held).sum()
+        weight_history[r] = target
+
+        # Hold until the next rebalance, letting weights drift with prices
+        stop = rebalance_days[r + 1] if r + 1 < len(rebalance_days) else n_days
+        growth = np.cumprod(1.0 + values[day:stop], axis=0)
+        value = growth @ target
+        block = np.diff(np.concatenate([[1.0], value])) / np.concatenate([[1.0], value[:-1]])
+        block[0] -= transaction_cost * turnover[r]
+        pf_returns[day - lookback:stop - lookback] = block
+
+        held = target * growth[-1] / value[-1]
+
+    equity = np.cumprod(1.0 + pf_returns)
+    index = panel.dates
+
+    return {
+        "dates": np.asarray(index[lookback:]),
+        "returns": pf_returns,
+        "equity": equity,
+        "drawdown": _drawdown(equity),
+        "rebalance_dates": np.asarray(index[rebalance_days]),
+        "turnover": turnover,
+        "weights": weight_history,
+        "tickers": list(tickers),
+        "lookback": lookback,
+    }
+
+
+@profiled()
+def summarize_backtest(backtest, risk_free_rate=RISK_FREE_RATE, trading_days=252):
+    """Annualized performance summary of a walk-forward backtest."""
+
+    returns = backtest["returns"]
+    annual_return = returns.mean() * trading_days
+    annual_vol = returns.std() * np.sqrt(trading_days)
+
+    return pd.Series({
+        "Annual Return": annual_return,
+        "Annual Volatility": annual_vol,
+        "Sharpe Ratio": (annual_return - risk_free_rate) / annual_vol,
+        "Max Drawdown": backtest["drawdown"].min(),
+        "Avg. Turnover": backtest["turnover"][1:].mean() if len(backtest["turnover"]) > 1 else 0.0,
+        "Total Return": backtest["equity"][-1] - 1.0,
+    })
@@ -1,12 +1,26 @@
 """CAPM Regression Calculations & Summaries"""
 
+import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 
+from analysis.panel import as_returns_panel
+from utils.profiler import profiled
+
+def _daily_rf(risk_free_rate):
+    """Convert an annual risk-free rate to daily"""
+
+    return (1 + risk_free_rate) ** (1/252) - 1
+
+
+@profiled()
 def compute_capm(stock_returns, market_returns, risk_free_rate=0.02):
     """
     Compute CAPM alpha, beta, and regression statistics.
 
+    Two Series are aligned on their common dates with a return in both;
+    arrays (e.g. from ReturnsPanel.pair) must already be aligned and are
+    used as they are.
+
     Returns dict with:
     - alpha
     - beta
@@ -14,19 +28,26 @@ def compute_capm(stock_returns, market_returns, risk_free_rate=0.02):
     - model (statsmodels OLS object)
     """
 
+    if isinstance(stock_returns, pd.Series) and isinstance(market_returns, pd.Series):
+        # Regress on the dates both series have a return
+        both = pd.concat([stock_returns, market_returns], axis=1, join="inner").dropna()
+        stock_returns, market_returns = both.iloc[:, 0], both.iloc[:, 1]
+
     # Convert risk-free rate to daily
-    rf_daily = (1 + risk_free_rate) ** (1/252) - 1
+    rf_daily = _daily_rf(risk_free_rate)
 
     # Excess returns
     stock_excess = stock_returns - rf_daily
     market_excess = market_returns - rf_daily
 
+    # Imported on first use: statsmodels alone costs over a second at startup
+    import statsmodels.api as sm
+
     # CAPM regression: stock_excess ~ alpha + beta * market_excess
     X = sm.add_constant(market_excess)
     model = sm.OLS(stock_excess, X).fit()
 
-    alpha = model.params.iloc[0]
-    beta = model.params.iloc[1]
+    alpha, beta = np.asarray(model.params)[:2]
     r_squared = model.rsquared
 
     return {
@@ -37,31 +58,126 @@ def compute_capm(stock_returns, market_returns, risk_free_rate=0.02):
     }
 
 
-def summarize_capm_table(daily_returns, market_returns, risk_free_rate=0.02):
+class CAPMBatch:
+    """
+    CAPM regressions for every column of a returns matrix, solved in closed form.
+
+    All tickers share the same regressor, so one pass over the centered
+    returns matrix gives every alpha, beta, R², standard error and t-stat.
+    statsmodels OLS objects are only built on request via model().
+
+    daily_returns may be a ReturnsPanel carrying the market (then
+    market_returns can be omitted). Each ticker is regressed on the days
+    both it and the market have a return.
+    """
+
+    def __init__(self, daily_returns, market_returns=None, risk_free_rate=0.02):
+        panel = as_returns_panel(daily_returns, market_returns)
+        if panel.market is None:
+            raise ValueError("CAPM needs market returns (pass market_returns or a panel with a market).")
+
+        rf_daily = _daily_rf(risk_free_rate)
+        self.tickers = list(panel.tickers)
+        self.index = panel.dates
+        self.stock_excess = panel.values - rf_daily
+        self.market_excess = panel.market - rf_daily
+
+        # Observed (ticker, day) pairs; None when every pair is observed
+        observed = panel.mask & ~np.isnan(panel.market)[:, None]
+        self.observed = None if observed.all() else observed
+        self._models = {}
+
+        self.table = self._solve()
+
+    def _sums(self):
+        '''observation counts, means and centered (co)moment sums per ticker'''
+
+        y = self.stock_excess
+        x = self.market_excess
+
+        if self.observed is None:
+            x_mean = x.mean()
+            y_mean = y.mean(axis=0)
+            x_c = x - x_mean
+            y_c = y - y_mean
+            return len(x), x_mean, y_mean, x_c @ x_c, x_c @ y_c, (y_c * y_c).sum(axis=0)
+
+        # The regressor differs per ticker once days are missing, so it is
+        # broadcast to a matrix and masked like the returns
+        w = self.observed
+        n_obs = w.sum(axis=0)
+        x = np.where(w, x[:, None], 0.0)
+        y = np.where(w, y, 0.0)
+        x_mean = x.sum(axis=0) / n_obs
+        y_mean = y.sum(axis=0) / n_obs
+        x_c = np.where(w, x - x_mean, 0.0)
+        y_c = np.where(w, y - y_mean, 0.0)
+        return (n_obs, x_mean, y_mean, (x_c * x_c).sum(axis=0),
+                (x_c * y_c).sum(axis=0), (y_c * y_c).sum(axis=0))
+
+    @profiled()
+    def _solve(self):
+        '''closed-form OLS of every column on the market excess return'''
+
+        n_obs, x_mean, y_mean, sxx, sxy, syy = self._sums()
+
+        beta = sxy / sxx
+        alpha = y_mean - beta * x_mean
+        ssr = syy - beta * sxy
+        r_squared = 1 - ssr / syy
+
+        sigma2 = ssr / (n_obs - 2)
+        beta_se = np.sqrt(sigma2 / sxx)
+        alpha_se = np.sqrt(sigma2 * (1 / n_obs + x_mean ** 2 / sxx))
+
+        table = pd.DataFrame({
+            "Alpha": alpha,
+            "Beta": beta,
+            "R²": r_squared,
+            "Alpha SE": alpha_se,
+            "Beta SE": beta_se,
+            "Alpha t": alpha / alpha_se,
+            "Beta t": beta / beta_se,
+        }, index=pd.Index(self.tickers, name="Ticker"))
+        return table
+
+    def stats(self, ticker):
+        """Return the same dict keys as compute_capm() for one ticker (model is lazy)."""
+
+        row = self.table.loc[ticker]
+        return {
+            "alpha": row["Alpha"],
+            "beta": row["Beta"],
+            "r_squared": row["R²"],
+            "alpha_se": row["Alpha SE"],
+            "beta_se": row["Beta SE"],
+            "alpha_t": row["Alpha t"],
+            "beta_t": row["Beta t"],
+        }
+
+    def model(self, ticker):
+        """Build (and cache) the full statsmodels OLS fit for one ticker."""
+
+        if ticker not in self._models:
+            import statsmodels.api as sm
+
+            col = self.tickers.index(ticker)
+            rows = slice(None) if self.observed is None else self.observed[:, col]
+            X = sm.add_constant(pd.Series(self.market_excess[rows], index=self.index[rows]))
+            y = pd.Series(self.stock_excess[rows, col], index=self.index[rows], name=ticker)
+            self._models[ticker] = sm.OLS(y, X).fit()
+        return self._models[ticker]
+
+
+@profiled()
+def summarize_capm_table(daily_returns, market_returns=None, risk_free_rate=0.02):
     """
-    Computes CAPM alpha, beta, R² for EACH stock in the dataset.
+    Computes CAPM alpha, beta, R² (plus standard errors and t-stats)
+    for EACH stock in the dataset in one batched regression.
     Returns a DataFrame indexed by ticker.
     """
 
-    rows = []
-
-    for ticker in daily_returns.columns:
-        stats = compute_capm(
-            daily_returns[ticker],
-            market_returns,
-            risk_free_rate=risk_free_rate
-        )
-
-        rows.append({
-            "Ticker": ticker,
-            "Alpha": stats["alpha"],
-            "Beta": stats["beta"],
-            "R²": stats["r_squared"],
-        })
-
-    df = pd.DataFrame(rows)
-    df = df.set_index("Ticker")
-    return df
+    return CAPMBatch(daily_returns, market_returns, risk_free_rate).table
 
 
 def compute_portfolio_beta(weights, beta_series):
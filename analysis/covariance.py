@@ -0,0 +1,286 @@
+"""Covariance models: dense, Ledoit-Wolf shrinkage and low-rank factor"""
+
+import numpy as np
+import pandas as pd
+
+from analysis.panel import as_returns_panel
+from utils.profiler import profiled
+
+
+class CovarianceModel:
+    """
+    Interface shared by the optimizer, frontier and Monte Carlo code.
+
+    Implementations only need to provide the operations those callers use,
+    so a factor model never has to materialize the n x n matrix.
+    """
+
+    tickers = None
+
+    @property
+    def n_assets(self):
+        '''number of assets'''
+        raise NotImplementedError
+
+    def matvec(self, x):
+        """Sigma @ x for a vector (n,) or a matrix (n, k)."""
+        raise NotImplementedError
+
+    def quad(self, weights):
+        """w' Sigma w for a vector, or per row of an (m, n) matrix."""
+        raise NotImplementedError
+
+    def diag(self):
+        """Asset variances."""
+        raise NotImplementedError
+
+    def submatrix(self, rows, cols):
+        """Dense block Sigma[rows][:, cols]."""
+        raise NotImplementedError
+
+    def scaled(self, factor):
+        """New model equal to factor * Sigma (e.g. daily -> annual)."""
+        raise NotImplementedError
+
+    @property
+    def shock_dim(self):
+        '''number of standard normals needed per correlated draw'''
+        raise NotImplementedError
+
+    def transform_shocks(self, z):
+        """Map (m, shock_dim) standard normals to (m, n) draws with covariance Sigma."""
+        raise NotImplementedError
+
+    def prepare_sampling(self):
+        """Precompute whatever transform_shocks() needs (before pickling to workers)."""
+        return self
+
+    def column(self, j):
+        """Column j of Sigma."""
+
+        return self.submatrix(np.arange(self.n_assets), [j])[:, 0]
+
+    def dense(self):
+        """Full n x n matrix (O(n^2) memory)."""
+
+        idx = np.arange(self.n_assets)
+        return self.submatrix(idx, idx)
+
+    def to_frame(self):
+        """Dense matrix as a DataFrame labelled by ticker."""
+
+        return pd.DataFrame(self.dense(), index=self.tickers, columns=self.tickers)
+
+
+class DenseCovariance(CovarianceModel):
+    """Plain n x n covariance matrix."""
+
+    def __init__(self, matrix, tickers=None):
+        if tickers is None and isinstance(matrix, pd.DataFrame):
+            tickers = list(matrix.columns)
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        self.tickers = tickers
+        self._chol = None
+
+    @property
+    def n_assets(self):
+        return len(self.matrix)
+
+    def matvec(self, x):
+        return self.matrix @ x
+
+    def quad(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim == 1:
+            return weights @ self.matrix @ weights
+        return np.einsum("ij,ij->i", weights @ self.matrix, weights)
+
+    def diag(self):
+        return np.diag(self.matrix).copy()
+
+    def submatrix(self, rows, cols):
+        return self.matrix[np.ix_(rows, cols)]
+
+    def column(self, j):
+        return self.matrix[:, j]
+
+    def dense(self):
+        return self.matrix
+
+    def scaled(self, factor):
+        return DenseCovariance(self.matrix * factor, self.tickers)
+
+    @property
+    def shock_dim(self):
+        return self.n_assets
+
+    def prepare_sampling(self):
+        if self._chol is None:
+            try:
+                self._chol = np.linalg.cholesky(self.matrix)
+            except np.linalg.LinAlgError:
+                # Not positive definite: clip negative eigenvalues
+                eigval, eigvec = np.linalg.eigh(self.matrix)
+                self._chol = eigvec * np.sqrt(np.clip(eigval, 0.0, None))
+        return self
+
+    def transform_shocks(self, z):
+        return z @ self.prepare_sampling()._chol.T
+
+
+class FactorCovariance(CovarianceModel):
+    """
+    Low-rank plus diagonal model Sigma = B F B' + D.
+
+    loadings B is (n, k), factor_cov F is (k, k) and specific_var D is (n,).
+    Products and quadratic forms cost O(n k) instead of O(n^2).
+    """
+
+    def __init__(self, loadings, factor_cov, specific_var, tickers=None):
+        self.loadings = np.asarray(loadings, dtype=np.float64)
+        self.factor_cov = np.atleast_2d(np.asarray(factor_cov, dtype=np.float64))
+        self.specific_var = np.asarray(specific_var, dtype=np.float64)
+        self.tickers = tickers
+
+        # B L with F = L L', so B F B' = (B L)(B L)'
+        self._factor_chol = np.linalg.cholesky(self.factor_cov)
+        self._scaled_loadings = self.loadings @ self._factor_chol
+
+    @property
+    def n_assets(self):
+        return len(self.specific_var)
+
+    @property
+    def n_factors(self):
+        '''number of factors k'''
+        return self.loadings.shape[1]
+
+    def matvec(self, x):
+        x = np.asarray(x, dtype=np.float64)
+        bl = self._scaled_loadings
+        spec = self.specific_var if x.ndim == 1 else self.specific_var[:, None]
+        return bl @ (bl.T @ x) + spec * x
+
+    def quad(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        exposure = weights @ self._scaled_loadings
+        if weights.ndim == 1:
+            return exposure @ exposure + (weights * weights) @ self.specific_var
+        return np.einsum("ij,ij->i", exposure, exposure) + (weights * weights) @ self.specific_var
+
+    def diag(self):
+        bl = self._scaled_loadings
+        return np.einsum("ij,ij->i", bl, bl) + self.specific_var
+
+    def submatrix(self, rows, cols):
+        bl = self._scaled_loadings
+        block = bl[rows] @ bl[cols].T
+        rows, cols = np.asarray(rows), np.asarray(cols)
+        same = rows[:, None] == cols[None, :]
+        block[same] += self.specific_var[np.broadcast_to(rows[:, None], same.shape)[same]]
+        return block
+
+    def scaled(self, factor):
+        return FactorCovariance(
+            self.loadings, self.factor_cov * factor, self.specific_var * factor, self.tickers
+        )
+
+    @property
+    def shock_dim(self):
+        return self.n_factors + self.n_assets
+
+    def transform_shocks(self, z):
+        k = self.n_factors
+        return z[:, :k] @ self._scaled_loadings.T + z[:, k:] * np.sqrt(self.specific_var)
+
+
+def as_covariance_model(cov):
+    """Wrap a DataFrame/array as DenseCovariance; models pass through."""
+
+    if isinstance(cov, CovarianceModel):
+        return cov
+    return DenseCovariance(cov)
+
+
+@profiled()
+def sample_covariance(daily_returns):
+    """Dense sample covariance of a returns DataFrame or ReturnsPanel (cached on the panel)."""
+
+    panel = as_returns_panel(daily_returns)
+    return DenseCovariance(panel.cov(), list(panel.tickers))
+
+
+@profiled()
+def ledoit_wolf(daily_returns):
+    """
+    Ledoit-Wolf shrinkage toward a scaled identity.
+
+    Uses the 2004 optimal shrinkage intensity (same normalization as
+    scikit-learn, i.e. the 1/T covariance estimator).
+    """
+
+    panel = as_returns_panel(daily_returns).complete()
+    x = panel.values - panel.mean()
+    n_obs, n_assets = x.shape
+
+    emp_cov = x.T @ x / n_obs
+    mu = np.trace(emp_cov) / n_assets
+
+    x2 = x * x
+    beta = ((x2.T @ x2).sum() / n_obs - (emp_cov ** 2).sum()) / n_obs
+    delta = ((emp_cov - mu * np.eye(n_assets)) ** 2).sum()
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+
+    shrunk = (1 - shrinkage) * emp_cov
+    shrunk[np.diag_indices(n_assets)] += shrinkage * mu
+
+    model = DenseCovariance(shrunk, list(panel.tickers))
+    model.shrinkage = shrinkage
+    return model
+
+
+@profiled()
+def statistical_factor_model(daily_returns, n_factors=5):
+    """
+    PCA factor model from a thin SVD of the centered returns.
+
+    Never forms the n x n sample covariance: the top components give the
+    loadings and the residual variance fills the diagonal.
+    """
+
+    panel = as_returns_panel(daily_returns).complete()
+    x = panel.values - panel.mean()
+    n_obs = len(x)
+
+    _, s, vt = np.linalg.svd(x, full_matrices=False)
+    k = min(n_factors, len(s))
+    loadings = vt[:k].T * (s[:k] / np.sqrt(n_obs - 1))
+
+    total_var = (x * x).sum(axis=0) / (n_obs - 1)
+    specific = np.maximum(total_var - (loadings * loadings).sum(axis=1), 1e-12 * total_var.max())
+
+    return FactorCovariance(loadings, np.eye(k), specific, list(panel.tickers))
+
+
+@profiled()
+def market_factor_model(daily_returns, market_returns=None):
+    """
+    Single-index model: Sigma = beta beta' var(m) + diag(residual variance).
+
+    market_returns may be omitted when daily_returns is a ReturnsPanel
+    that carries the market.
+    """
+
+    panel = as_returns_panel(daily_returns, market_returns).complete(market=True)
+
+    y = panel.values
+    m = panel.market
+    y = y - panel.mean()
+    m = m - m.mean()
+    n_obs = len(m)
+
+    market_var = m @ m / (n_obs - 1)
+    beta = (m @ y) / (n_obs - 1) / market_var
+    residual = ((y - np.outer(m, beta)) ** 2).sum(axis=0) / (n_obs - 1)
+
+    return FactorCovariance(beta[:, None], [[market_var]], residual, list(panel.tickers))
@@ -1,35 +1,263 @@
 """Handle efficient frontier and tangency portfolio"""
 
 import numpy as np
+from analysis.covariance import as_covariance_model
+from analysis.random_portfolios import sample_random_portfolios
+from config.settings import TRADING_DAYS
+from utils.profiler import count, profiled
 
-def compute_portfolio_performance(weights, mean_returns, cov_matrix):
-    """Compute portfolio performance"""
 
-    returns = np.sum(mean_returns * weights) * 252
-    volatility = np.sqrt(np.dot(weights.T, np.dot(cov_matrix * 252, weights)))
-    sharpe_ratio = returns / volatility
-    return volatility, returns, sharpe_ratio
+@profiled()
+def efficient_frontier(mean_returns, cov_matrix, iterations=5000, chunk_size=50_000, seed=None,
+                       dtype="float64"):
+    """Calculate efficient frontier
 
+    Returns (results, weight_records) where results is a (3, iterations)
+    array of volatility/return/sharpe and weight_records is an
+    (iterations, n_assets) array of the sampled weights, stored in
+    `dtype` (see sample_random_portfolios). A seed makes the sample
+    reproducible.
+    """
 
-def efficient_frontier(mean_returns, cov_matrix, iterations=5000):
-    """Calculate efficient frontier"""
+    sample = sample_random_portfolios(
+        mean_returns,
+        cov_matrix,
+        n_portfolios=iterations,
+        chunk_size=chunk_size,
+        keep_weights=True,
+        rng=np.random.default_rng(seed),
+        dtype=dtype,
+    )
 
-    results = np.zeros((3, iterations))
-    weight_records = []
+    return sample["results"], sample["weights"]
 
-    num_assets = len(mean_returns)
 
-    for i in range(iterations):
-        weights = np.random.random(num_assets)
-        weights /= np.sum(weights)
+def _free_solution(cov, mean, order, cov_inv, w_bound):
+    '''affine solution w(lam) = alpha + lam * beta for a fixed free set
 
-        weight_records.append(weights)
+    Minimizes 0.5 w'Cw - lam * mu'w subject to sum(w) = 1 with the
+    bounded weights held at w_bound. `order` lists the free assets and
+    `cov_inv` is the inverse of their covariance block. Also returns
+    gamma(lam) = g0 - lam * g1, the multiplier of the budget constraint.
+    '''
 
-        vol, ret, sharpe = compute_portfolio_performance(weights, mean_returns, cov_matrix)
+    fixed = w_bound.copy()
+    fixed[order] = 0.0
+    rhs = np.column_stack([
+        np.ones(len(order)),
+        mean[order],
+        cov.matvec(fixed)[order],
+    ])
+    u, v, z = (cov_inv @ rhs).T
 
-        results[0][i] = vol
-        results[1][i] = ret
-        results[2][i] = sharpe
+    g0 = (1.0 - fixed.sum() + z.sum()) / u.sum()
+    g1 = v.sum() / u.sum()
 
-    return results, weight_records
+    alpha = w_bound.copy()
+    beta = np.zeros_like(w_bound)
+    alpha[order] = g0 * u - z
+    beta[order] = v - g1 * u
+    return alpha, beta, g0, g1
 
+
+def _inverse_add(cov, order, cov_inv, j):
+    '''bordered update of the free-block inverse when asset j is freed'''
+
+    col = cov.column(j)
+    b = col[order]
+    u = cov_inv @ b
+    s = col[j] - b @ u
+
+    k = len(order)
+    new_inv = np.empty((k + 1, k + 1))
+    new_inv[:k, :k] = cov_inv + np.outer(u, u) / s
+    new_inv[:k, k] = -u / s
+    new_inv[k, :k] = -u / s
+    new_inv[k, k] = 1.0 / s
+    return new_inv
+
+
+def _inverse_remove(cov_inv, pos):
+    '''downdate of the free-block inverse when position pos is bounded'''
+
+    keep = np.arange(len(cov_inv)) != pos
+    col = cov_inv[keep, pos]
+    return cov_inv[np.ix_(keep, keep)] - np.outer(col, col) / cov_inv[pos, pos]
+
+
+def _segment_max_sharpe(r0, r1, g00, g01, g11, risk_free_rate):
+    '''exact max-Sharpe position a in [0, 1] on w0 + a (w1 - w0)
+
+    r0, r1 are the endpoint returns and g00, g01, g11 the entries of the
+    endpoints' covariance Gram matrix.
+    '''
+
+    # Excess return p + q*a and variance A a^2 + 2B a + C along the segment
+    p = r0 - risk_free_rate
+    q = r1 - r0
+    A = g00 - 2 * g01 + g11
+    B = g01 - g00
+    C = g00
+
+    candidates = [0.0, 1.0]
+    denom = q * B - p * A
+    if denom != 0:
+        a = (p * B - q * C) / denom
+        if 0.0 < a < 1.0:
+            candidates.append(a)
+
+    best_a, best_sharpe = 0.0, -np.inf
+    for a in candidates:
+        var = A * a * a + 2 * B * a + C
+        if var <= 0:
+            continue
+        sharpe = (p + q * a) / np.sqrt(var)
+        if sharpe > best_sharpe:
+            best_a, best_sharpe = a, sharpe
+    return best_a
+
+
+@profiled()
+def critical_line_frontier(mean_returns, cov_matrix, risk_free_rate=0.0,
+                           points_per_segment=25, tol=1e-10):
+    """
+    Exact long-only efficient frontier via the critical line algorithm.
+
+    Traces the corner (turning) portfolios of
+        min w'Cw - lam * mu'w   s.t.  sum(w) = 1,  0 <= w <= 1
+    as lam falls from +inf to 0. Between turning points the efficient
+    weights are linear, so the frontier, the minimum-variance portfolio
+    (lam = 0) and the tangency portfolio are exact.
+
+    mean_returns, cov_matrix: daily moments (Series/DataFrame, arrays or a
+        CovarianceModel; a factor model is never densified)
+    risk_free_rate: annual rate used for the tangency (Sharpe) portfolio
+
+    Returns dict with:
+    - turning_points: (k, n_assets) corner portfolio weights
+    - lambdas: risk-aversion value at each turning point
+    - frontier: (3, m) array of annual volatility/return/sharpe along the curve
+    - max_sharpe: dict(volatility, return, sharpe, weights)
+    - min_volatility: dict(volatility, return, sharpe, weights)
+    """
+
+    mean = np.asarray(mean_returns, dtype=np.float64) * TRADING_DAYS
+    cov = as_covariance_model(cov_matrix).scaled(TRADING_DAYS)
+    n_assets = len(mean)
+
+    # Start fully invested in the highest-return asset
+    top = int(np.argmax(mean))
+    weights = np.zeros(n_assets)
+    weights[top] = 1.0
+    free = np.zeros(n_assets, dtype=bool)
+    free[top] = True
+    order = [top]
+    cov_inv = np.array([[1.0 / cov.diag()[top]]])
+
+    turning_points = [weights.copy()]
+    lambdas = [np.inf]
+    lam = np.inf
+
+    for _ in range(4 * n_assets + 10):
+        alpha, beta, g0, g1 = _free_solution(cov, mean, order, cov_inv, weights)
+        lam_next, enter, leave, leave_bound = -np.inf, None, None, None
+        threshold = lam - tol * max(1.0, abs(lam)) if np.isfinite(lam) else np.inf
+
+        # A free weight hits a bound
+        idx = np.flatnonzero(free & (np.abs(beta) > tol))
+        for bound in (0.0, 1.0):
+            hit = (bound - alpha[idx]) / beta[idx]
+            ok = hit < threshold
+            if ok.any():
+                k = int(np.argmax(np.where(ok, hit, -np.inf)))
+                if hit[k] > lam_next:
+                    lam_next, leave, leave_bound, enter = hit[k], idx[k], bound, None
+
+        # A bounded weight's KKT multiplier reaches zero, so it becomes free
+        cov_a, cov_b = cov.matvec(np.column_stack([alpha, beta])).T
+        grad_a = cov_a - g0
+        grad_b = cov_b - mean + g1
+        idx = np.flatnonzero(~free & (np.abs(grad_b) > tol))
+        if idx.size:
+            hit = -grad_a[idx] / grad_b[idx]
+            ok = hit < threshold
+            if ok.any():
+                k = int(np.argmax(np.where(ok, hit, -np.inf)))
+                if hit[k] > lam_next:
+                    lam_next, enter, leave = hit[k], idx[k], None
+
+        if lam_next <= 0:
+            weights = np.clip(alpha, 0.0, 1.0)
+            weights /= weights.sum()
+            if not np.allclose(weights, turning_points[-1], rtol=0.0, atol=tol):
+                turning_points.append(weights)
+                lambdas.append(0.0)
+            break
+
+        lam = lam_next
+        weights = np.clip(alpha + lam * beta, 0.0, 1.0)
+        if leave is not None:
+            weights[leave] = leave_bound
+            free[leave] = False
+            pos = order.index(leave)
+            cov_inv = _inverse_remove(cov_inv, pos)
+            order.pop(pos)
+        else:
+            cov_inv = _inverse_add(cov, order, cov_inv, enter)
+            free[enter] = True
+            order.append(enter)
+
+        # An asset entering at zero weight (as at the first event, which
+        # leaves the starting corner unchanged) is not a new corner
+        if not np.allclose(weights, turning_points[-1], rtol=0.0, atol=tol):
+            turning_points.append(weights.copy())
+            lambdas.append(lam)
+
+    turning_points = np.array(turning_points)
+    count(turning_points=len(turning_points))
+    tp_returns = turning_points @ mean
+    gram = turning_points @ cov.matvec(turning_points.T)
+
+    # Frontier curve: weights, hence returns, are linear between consecutive
+    # turning points and variance is quadratic, so only the Gram matrix is needed
+    steps = np.linspace(0.0, 1.0, points_per_segment, endpoint=False)[None, :]
+    i = np.arange(len(turning_points) - 1)[:, None]
+    g00, g01, g11 = gram[i, i], gram[i, i + 1], gram[i + 1, i + 1]
+    curve_var = (1 - steps) ** 2 * g00 + 2 * steps * (1 - steps) * g01 + steps ** 2 * g11
+    curve_ret = (1 - steps) * tp_returns[i] + steps * tp_returns[i + 1]
+
+    curve_vol = np.append(np.sqrt(curve_var).ravel(), np.sqrt(gram[-1, -1]))
+    curve_ret = np.append(curve_ret.ravel(), tp_returns[-1])
+    frontier = np.vstack([curve_vol, curve_ret, (curve_ret - risk_free_rate) / curve_vol])
+
+    # Tangency portfolio: exact maximum on each linear segment
+    best = turning_points[0]
+    best_sharpe = -np.inf
+    for k in range(len(turning_points) - 1):
+        a = _segment_max_sharpe(
+            tp_returns[k], tp_returns[k + 1],
+            gram[k, k], gram[k, k + 1], gram[k + 1, k + 1],
+            risk_free_rate,
+        )
+        w = turning_points[k] + a * (turning_points[k + 1] - turning_points[k])
+        sharpe = (w @ mean - risk_free_rate) / np.sqrt(cov.quad(w))
+        if sharpe > best_sharpe:
+            best, best_sharpe = w, sharpe
+
+    def _record(w):
+        ret = float(w @ mean)
+        vol = float(np.sqrt(cov.quad(w)))
+        return {
+            "volatility": vol,
+            "return": ret,
+            "sharpe": (ret - risk_free_rate) / vol,
+            "weights": w,
+        }
+
+    return {
+        "turning_points": turning_points,
+        "lambdas": np.array(lambdas),
+        "frontier": frontier,
+        "max_sharpe": _record(best),
+        "min_volatility": _record(turning_points[-1]),
+    }
@@ -0,0 +1,172 @@
+"""Streaming mean / covariance state for daily returns"""
+
+import numpy as np
+
+from analysis.panel import as_returns_panel
+
+
+class RunningMoments:
+    """
+    Running count, mean and co-moment matrix of return rows.
+
+    Rows are folded in with the Welford/Chan pairwise update, so appending a
+    day costs O(n_assets^2) and states computed on separate shards can be
+    merged exactly. The state can be saved, reloaded and used to build
+    StockStatistics or PortfolioOptimizer without the raw history.
+
+    The state has one count shared by every ticker, so it only covers
+    complete days (rows with a return for every ticker). With missing
+    returns its moments therefore differ from ReturnsPanel.mean()/cov(),
+    which use each ticker's and each pair's observed days.
+    """
+
+    def __init__(self, tickers):
+        self.tickers = list(tickers)
+        n = len(self.tickers)
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros((n, n))
+
+    @classmethod
+    def from_returns(cls, daily_returns):
+        """
+        Build the state from a returns DataFrame or ReturnsPanel in one pass.
+
+        Only complete days are used: a day on which any ticker lacks a
+        return is left out for every ticker (see the class notes).
+        """
+
+        panel = as_returns_panel(daily_returns).complete()
+        moments = cls(panel.tickers)
+        moments.update(panel.values)
+        return moments
+
+    @staticmethod
+    def _batch(rows):
+        '''count, mean and co-moment matrix of a block of rows'''
+
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        mean = rows.mean(axis=0)
+        centered = rows - mean
+        return len(rows), mean, centered.T @ centered
+
+    def _combine(self, count, mean, m2):
+        '''Chan et al. pairwise combination with another (count, mean, m2)'''
+
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + np.outer(delta, delta) * (self.count * count / total)
+        self.mean += delta * (count / total)
+        self.count = total
+
+    def update(self, rows):
+        """Fold one or more new return rows (complete, without NaN) into the state."""
+
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        if np.isnan(rows).any():
+            raise ValueError("RunningMoments only takes complete rows; drop days with missing returns.")
+        if len(rows) == 1:
+            # Single-day Welford step
+            self.count += 1
+            delta = rows[0] - self.mean
+            self.mean += delta / self.count
+            self.m2 += np.outer(delta, rows[0] - self.mean)
+            return self
+
+        self._combine(*self._batch(rows))
+        return self
+
+    def remove(self, rows):
+        """Remove rows previously folded in (for rolling windows)."""
+
+        count, mean, m2 = self._batch(rows)
+        remaining = self.count - count
+        if remaining <= 0:
+            self.__init__(self.tickers)
+            return self
+
+        new_mean = (self.count * self.mean - count * mean) / remaining
+        delta = mean - new_mean
+        self.m2 -= m2 + np.outer(delta, delta) * (remaining * count / self.count)
+        self.mean = new_mean
+        self.count = remaining
+        return self
+
+    def merge(self, other):
+        """Merge the state of another shard with the same tickers."""
+
+        if other.tickers != self.tickers:
+            raise ValueError("Cannot merge moments over different tickers.")
+        self._combine(other.count, other.mean, other.m2)
+        return self
+
+    @classmethod
+    def merge_all(cls, shards):
+        """Combine a non-empty list of shard states into a new state."""
+
+        shards = list(shards)
+        if not shards:
+            raise ValueError("merge_all needs at least one shard (the tickers come from it).")
+        merged = cls(shards[0].tickers)
+        for shard in shards:
+            merged.merge(shard)
+        return merged
+
+    def cov(self):
+        """Sample covariance (ddof=1)."""
+
+        return self.m2 / (self.count - 1)
+
+    def var(self):
+        """Sample variances (ddof=1)."""
+
+        return np.diag(self.m2) / (self.count - 1)
+
+    def std(self):
+        """Sample standard deviations (ddof=1)."""
+
+        return np.sqrt(self.var())
+
+    def to_dict(self):
+        """JSON-serializable state."""
+
+        return {
+            "tickers": self.tickers,
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild a state produced by to_dict()."""
+
+        moments = cls(state["tickers"])
+        moments.count = int(state["count"])
+        moments.mean = np.asarray(state["mean"], dtype=np.float64)
+        moments.m2 = np.asarray(state["m2"], dtype=np.float64)
+        return moments
+
+    def save(self, path):
+        """Write the state to an .npz file."""
+
+        np.savez(
+            path,
+            tickers=np.array(self.tickers, dtype=str),
+            count=np.int64(self.count),
+            mean=self.mean,
+            m2=self.m2,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Read a state written by save()."""
+
+        with np.load(path) as npz:
+            moments = cls(npz["tickers"].tolist())
+            moments.count = int(npz["count"])
+            moments.mean = npz["mean"].astype(np.float64)
+            moments.m2 = npz["m2"].astype(np.float64)
+        return moments
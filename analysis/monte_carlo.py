@@ -1,14 +1,164 @@
 """Monte Carlo price simulation for individual stocks."""
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
 import numpy as np
 import pandas as pd
 
+from analysis.covariance import as_covariance_model, sample_covariance
+from analysis.panel import as_returns_panel
+from utils.profiler import profiled
+
+SAMPLING_METHODS = ("plain", "antithetic", "sobol")
+ESTIMATOR_METHODS = SAMPLING_METHODS + ("control_variate",)
+
+# Rows per float64 scratch block when paths are generated block by block
+_BLOCK_ROWS = 256
+
+
+def _brownian_bridge(z):
+    """Map standard normals to unit-step Brownian increments via a bridge.
+
+    Column 0 sets the terminal value and later columns fill in midpoints
+    breadth-first, so the leading (best-distributed) quasi-random
+    dimensions drive the coarse shape of each path.
+    """
+
+    n_paths, num_days = z.shape
+    walk = np.zeros((n_paths, num_days + 1))
+    walk[:, num_days] = np.sqrt(num_days) * z[:, 0]
+
+    col = 1
+    segments = [(0, num_days)]
+    while segments:
+        next_segments = []
+        for left, right in segments:
+            if right - left < 2:
+                continue
+            mid = (left + right) // 2
+            frac = (mid - left) / (right - left)
+            std = np.sqrt((mid - left) * (right - mid) / (right - left))
+            walk[:, mid] = walk[:, left] + frac * (walk[:, right] - walk[:, left]) + std * z[:, col]
+            col += 1
+            next_segments += [(left, mid), (mid, right)]
+        segments = next_segments
+
+    return np.diff(walk, axis=1)
+
+
+def _shock_blocks(method, n_paths, num_days, seed_seq, block_rows=None):
+    """Yield (first row, block) pieces of the standard normal daily shocks.
+
+    Blocks of at most block_rows rows (None = all at once) together cover
+    the (n_paths, num_days) shocks of a sampling method, and the values do
+    not depend on the block size: the normal and Sobol streams are drawn
+    in row order, antithetic blocks yield their mirrored rows right after
+    them, and the Brownian bridge works row by row.
+    """
+
+    rng = np.random.default_rng(seed_seq)
+    block_rows = min(block_rows or n_paths, n_paths)
+
+    # Blocks are scratch buffers reused for the next block, so callers may
+    # transform them in place but must copy out what they keep
+    if method == "plain":
+        scratch = np.empty((block_rows, num_days))
+        for start in range(0, n_paths, block_rows):
+            block = scratch[:min(block_rows, n_paths - start)]
+            rng.standard_normal(out=block)
+            yield start, block
+
+    elif method == "antithetic":
+        half = (n_paths + 1) // 2
+        scratch = np.empty((block_rows, num_days))
+        mirror = np.empty((block_rows, num_days))
+        for start in range(0, half, block_rows):
+            block = scratch[:min(block_rows, half - start)]
+            rng.standard_normal(out=block)
+            # Mirrored before the caller changes the block
+            n_mirror = min(len(block), n_paths - half - start)
+            flipped = np.negative(block[:n_mirror], out=mirror[:n_mirror])
+            yield start, block
+            yield half + start, flipped
+
+    elif method == "sobol":
+        # Scrambled Sobol points (balanced for powers of two) + Brownian bridge;
+        # scipy.stats is slow to import, so only this mode loads it
+        from scipy.stats import norm, qmc
+
+        sampler = qmc.Sobol(d=num_days, scramble=True, seed=rng)
+        for start in range(0, n_paths, block_rows):
+            u = sampler.random(min(block_rows, n_paths - start))
+            yield start, _brownian_bridge(norm.ppf(np.clip(u, 1e-12, 1 - 1e-12)))
+
+    else:
+        raise ValueError(f"Unknown sampling method: {method}")
+
+
+def _standard_shocks(method, n_paths, num_days, seed_seq):
+    """(n_paths, num_days) standard normal daily shocks for a sampling method."""
 
+    shocks = np.empty((n_paths, num_days))
+    for start, block in _shock_blocks(method, n_paths, num_days, seed_seq):
+        shocks[start:start + len(block)] = block
+    return shocks
+
+
+def _grow_paths(paths, mu, sigma, last_price):
+    """Turn float64 standard normal shocks into price paths, in place.
+
+    Returns, cumulative log-returns and prices all share the one array.
+    """
+
+    paths *= sigma
+    paths += mu
+    np.cumsum(paths, axis=1, out=paths)
+    np.exp(paths, out=paths)
+    paths *= last_price
+    return paths
+
+
+def _draw_paths(out, method, seed_seq, mu, sigma, last_price):
+    """Fill `out` with Monte Carlo price paths of a sampling method.
+
+    Plain float64 buffers are drawn and grown in place. Otherwise shocks
+    are generated and grown in float64 blocks of _BLOCK_ROWS rows that are
+    written straight into `out`: the draws are the same as in float64 mode
+    and only the stored prices are rounded, and no full-size float64 array
+    is ever built.
+    """
+
+    if method == "plain" and out.dtype == np.float64:
+        np.random.default_rng(seed_seq).standard_normal(out=out)
+        return _grow_paths(out, mu, sigma, last_price)
+
+    n_paths, num_days = out.shape
+    for start, block in _shock_blocks(method, n_paths, num_days, seed_seq, _BLOCK_ROWS):
+        out[start:start + len(block)] = _grow_paths(block, mu, sigma, last_price)
+    return out
+
+
+def _path_buffer(out, shape, dtype):
+    '''validated caller buffer, or a new one'''
+
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != shape or out.dtype not in (np.float32, np.float64) or not out.flags.c_contiguous:
+        raise ValueError(f"out must be a C-contiguous float32/float64 array of shape {shape}.")
+    return out
+
+
+@profiled()
 def simulate_stock_paths(
     last_price: float,
     daily_returns: pd.Series,
     num_days: int = 252,
-    num_simulations: int = 5000
+    num_simulations: int = 5000,
+    seed=None,
+    method: str = "plain",
+    dtype="float64",
+    out=None,
 ):
     """
     Monte Carlo simulation of future stock prices.
@@ -18,6 +168,17 @@ def simulate_stock_paths(
         daily_returns: historical daily returns (used to estimate mu & sigma)
         num_days: number of forecast days (default 1 year)
         num_simulations: number of random paths
+        seed: int or SeedSequence for reproducible draws
+        method: "plain", "antithetic" or "sobol" (scrambled, Brownian bridge)
+        dtype: "float64" or "float32". In float32 mode the same shocks are
+            drawn and grown in float64 and only the stored prices are
+            rounded, so each price is within a relative 2^-24 (~6e-8) of
+            the float64 result. Every method grows its shocks in blocks of
+            _BLOCK_ROWS rows, so the peak is the output plus a few blocks:
+            20000 x 252 paths peak at 40/41/46 MB (plain/antithetic/sobol)
+            in float64 and 21/21/26 MB in float32
+        out: optional (num_simulations, num_days) buffer to fill, e.g. one
+            reused across tickers; its dtype takes precedence over `dtype`
 
     Returns:
         numpy array of shape (num_simulations, num_days)
@@ -25,11 +186,595 @@ def simulate_stock_paths(
 
     mu = daily_returns.mean()
     sigma = daily_returns.std()
+    out = _path_buffer(out, (num_simulations, num_days), dtype)
+
+    return _draw_paths(out, method, seed, mu, sigma, last_price)
+
+
+def _chunk_seeds(seed, n_chunks, key=()):
+    """Independent SeedSequence per chunk, derived only from (seed, key, chunk).
+
+    The stream for a chunk does not depend on how chunks are assigned to
+    workers, so results are bit-identical for any worker count.
+    """
+
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return [
+        np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + tuple(key) + (j,))
+        for j in range(n_chunks)
+    ]
+
+
+def _run_tasks(func, tasks, workers):
+    """Yield func over argument tuples, in order, optionally in a process pool.
+
+    In-process results are produced one at a time, so a caller that folds
+    them as they arrive holds a single chunk's output at once.
+    """
+
+    if workers is None or workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield func(*task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(func, *zip(*tasks))
+
+
+def _stock_chunk(last_price, mu, sigma, n_paths, num_days, seed_seq, dtype="float64", out=None):
+    """One chunk of independent single-stock price paths (written to `out` if given)."""
+
+    out = _path_buffer(out, (n_paths, num_days), dtype)
+    return _draw_paths(out, "plain", seed_seq, mu, sigma, last_price)
+
+
+@profiled()
+def simulate_many_stocks(
+    last_prices: pd.Series,
+    daily_returns: pd.DataFrame,
+    num_days: int = 252,
+    num_simulations: int = 5000,
+    chunk_size: int = 1000,
+    seed=None,
+    workers: int = 1,
+    dtype="float64",
+):
+    """
+    Independent per-ticker simulations fanned out by ticker and path chunk.
+
+    Chunk j of ticker i always uses the generator spawned from
+    (seed, i, j), so the output is identical for any number of workers.
+    Each ticker's array is allocated once and in-process chunks are
+    written straight into it; dtype="float32" halves it (error bound as
+    in simulate_stock_paths).
+
+    Returns dict of ticker -> array (num_simulations, num_days).
+    """
+
+    tickers = list(daily_returns.columns)
+    mu = daily_returns.mean()
+    sigma = daily_returns.std()
+
+    n_chunks = -(-num_simulations // chunk_size)
+    paths = {t: np.empty((num_simulations, num_days), dtype=dtype) for t in tickers}
+    tasks, slots = [], []
+    for i, ticker in enumerate(tickers):
+        for j, seed_seq in enumerate(_chunk_seeds(seed, n_chunks, key=(i,))):
+            start = j * chunk_size
+            n_paths = min(chunk_size, num_simulations - start)
+            tasks.append((float(last_prices[ticker]), float(mu[ticker]),
+                          float(sigma[ticker]), n_paths, num_days, seed_seq, dtype))
+            slots.append(paths[ticker][start:start + n_paths])
+
+    if workers is None or workers <= 1 or len(tasks) <= 1:
+        for task, slot in zip(tasks, slots):
+            _stock_chunk(*task, out=slot)
+    else:
+        for slot, chunk in zip(slots, _run_tasks(_stock_chunk, tasks, workers)):
+            slot[...] = chunk
+
+    return paths
+
+
+# Standardized grid used for streaming percentile estimates
+_GRID_LOW = -8.0
+_GRID_HIGH = 8.0
+
+
+def _bin_index(z, bins):
+    """Histogram bin for standardized values on the fixed grid."""
+
+    width = (_GRID_HIGH - _GRID_LOW) / bins
+    idx = np.floor((z - _GRID_LOW) / width).astype(np.int64)
+    return np.clip(idx, 0, bins - 1)
+
+
+def _histogram_quantiles(counts, quantiles, bins):
+    """Standardized quantiles from fixed-grid counts (last axis = bins)."""
+
+    width = (_GRID_HIGH - _GRID_LOW) / bins
+    # Counts never exceed the number of paths, so the CDF keeps their dtype
+    cdf = np.cumsum(counts, axis=-1, dtype=counts.dtype)
+    total = cdf[..., -1:]
+
+    out = []
+    for q in quantiles:
+        target = q * total
+        b = np.argmax(cdf >= target, axis=-1)[..., None]
+        below = np.take_along_axis(cdf, b, axis=-1) - np.take_along_axis(counts, b, axis=-1)
+        in_bin = np.maximum(np.take_along_axis(counts, b, axis=-1), 1)
+        frac = np.clip((target - below) / in_bin, 0.0, 1.0)
+        out.append((_GRID_LOW + width * (b + frac))[..., 0])
+    return np.array(out)
+
+
+def _simulate_chunk(n_paths, params, seed_seq):
+    """Simulate one chunk of correlated paths day by day.
+
+    Only running accumulators are returned: histogram counts per day and
+    asset, terminal sums, portfolio P&L statistics and, if requested, the
+    first few full paths. Memory is O(n_paths * n_assets).
+    """
+
+    rng = np.random.default_rng(seed_seq)
+    mu, sigma, cov = params["mu"], params["sigma"], params["cov"]
+    num_days, bins = params["num_days"], params["bins"]
+    weights = params["weights"]
+    n_assets = len(mu)
+
+    # Compact mode stores kept paths in float32 and counts in int32; shocks,
+    # log-returns and all sums stay float64, so the draws are unchanged
+    dtype = np.dtype(params["dtype"])
+    count_dtype = np.int64 if dtype == np.float64 else np.int32
+
+    keep = min(params["keep_paths"], n_paths)
+    sample = np.empty((keep, num_days, n_assets), dtype=dtype) if keep else None
+
+    band_counts = np.zeros((num_days, n_assets, bins), dtype=count_dtype)
+    offsets = np.arange(n_assets) * bins
+    log_ret = np.zeros((n_paths, n_assets))
+
+    # Per-day buffers, reused for every day
+    shocks = np.empty((n_paths, cov.shock_dim))
+    z = np.empty((n_paths, n_assets))
+
+    for day in range(num_days):
+        rng.standard_normal(out=shocks)
+        log_ret += cov.transform_shocks(shocks)
+        log_ret += mu
+
+        t = day + 1
+        np.subtract(log_ret, mu * t, out=z)
+        z /= sigma * np.sqrt(t)
+        flat = (_bin_index(z, bins) + offsets).ravel()
+        band_counts[day] = np.bincount(flat, minlength=n_assets * bins).reshape(n_assets, bins)
+
+        if keep:
+            sample[:, day] = log_ret[:keep]
+
+    growth = np.exp(log_ret)
+    acc = {
+        "n": n_paths,
+        "band_counts": band_counts,
+        "terminal_sum": growth.sum(axis=0),
+        "terminal_sumsq": (growth * growth).sum(axis=0),
+        "sample": np.exp(sample, out=sample) if keep else None,
+        "terminal": growth.astype(dtype, copy=False) if params["keep_terminal"] else None,
+    }
+
+    if weights is not None:
+        pf_growth = growth @ weights
+        z = (np.log(pf_growth) - params["pf_mu"] * num_days) / (params["pf_sigma"] * np.sqrt(num_days))
+        acc["pf_counts"] = np.bincount(_bin_index(z, bins), minlength=bins)
+        acc["pf_sum"] = pf_growth.sum()
+        acc["pf_sumsq"] = pf_growth @ pf_growth
+        acc["pf_losses"] = int((pf_growth < 1.0).sum())
+
+    return acc
+
+
+def _merge_accumulators(total, acc):
+    """Fold one chunk's accumulators into the running totals."""
+
+    if total is None:
+        return acc
+
+    # In place, so merging never holds a third copy of the band counts
+    for key in ("n", "band_counts", "terminal_sum", "terminal_sumsq",
+                "pf_counts", "pf_sum", "pf_sumsq", "pf_losses"):
+        if key in total:
+            total[key] += acc[key]
+
+    if total["sample"] is not None and acc["sample"] is not None:
+        total["sample"] = np.concatenate([total["sample"], acc["sample"]])
+    elif total["sample"] is None:
+        total["sample"] = acc["sample"]
+
+    if total["terminal"] is not None:
+        total["terminal"] = np.concatenate([total["terminal"], acc["terminal"]])
+
+    return total
+
+
+@profiled()
+def simulate_correlated_paths(
+    last_prices: pd.Series,
+    daily_returns: pd.DataFrame,
+    weights=None,
+    num_days: int = 252,
+    num_simulations: int = 5000,
+    chunk_size: int = 1000,
+    quantiles=(0.05, 0.25, 0.5, 0.75, 0.95),
+    bins: int = 400,
+    keep_paths: int = 0,
+    keep_terminal: bool = False,
+    portfolio_value: float = 1.0,
+    seed=None,
+    workers: int = 1,
+    cov_model=None,
+    dtype="float64",
+):
+    """
+    Joint Monte Carlo simulation of correlated stock prices.
+
+    Daily log-returns are drawn as mu + L z, where L L' is the historical
+    covariance, so cross-asset correlation is preserved. With a factor
+    cov_model the draw is B f + sqrt(D) e, which costs O(n_assets * k).
+    Paths are generated in chunks of `chunk_size` and reduced to streaming
+    summaries; full paths are never held in memory.
+
+    Parameters:
+        last_prices: most recent close per ticker
+        daily_returns: historical daily returns (DataFrame with tickers as
+            columns, or a ReturnsPanel)
+        weights: optional portfolio weights (buy-and-hold) for P&L stats
+        num_days: number of forecast days
+        num_simulations: total number of random paths
+        chunk_size: paths simulated per chunk
+        quantiles: percentile levels for bands and terminal values
+        bins: resolution of the fixed grid used for streaming percentiles
+        keep_paths: number of full paths to keep for plotting
+        keep_terminal: keep every terminal price (num_simulations x n_assets)
+        portfolio_value: starting value of the portfolio for P&L
+        seed: int or SeedSequence; each chunk gets its own spawned stream
+        workers: processes used to simulate chunks (results do not depend on it)
+        cov_model: daily CovarianceModel to use instead of the sample covariance
+        dtype: "float32" keeps histogram counts in int32 and sample and
+            terminal paths in float32, halving the per-chunk accumulators.
+            Shocks, log-returns and moments stay float64, so bands,
+            quantiles and P&L statistics are identical to float64 mode and
+            kept prices are within a relative ~2e-7 of it
+
+    Returns dict with:
+    - bands: (len(quantiles), num_days, n_assets) price percentile bands
+    - terminal_quantiles: DataFrame of terminal prices (quantile x ticker)
+    - terminal_mean, terminal_std: Series of terminal price moments
+    - portfolio: dict of P&L mean/std/quantiles/prob_loss (if weights given)
+    - sample_paths: (keep_paths, num_days, n_assets) prices, or None
+    - terminal_prices: (num_simulations, n_assets) prices, or None
+    """
+
+    panel = as_returns_panel(daily_returns)
+    tickers = list(panel.tickers)
+    prices = np.asarray(pd.Series(last_prices)[tickers], dtype=np.float64)
+
+    mu = panel.mean()
+    if cov_model is None:
+        cov_model = sample_covariance(panel)
+    cov = as_covariance_model(cov_model).prepare_sampling()
+    sigma = np.sqrt(cov.diag())
+    sigma = np.where(sigma > 0, sigma, 1.0)
+
+    params = {
+        "mu": mu,
+        "sigma": sigma,
+        "cov": cov,
+        "num_days": num_days,
+        "bins": bins,
+        "keep_paths": keep_paths,
+        "keep_terminal": keep_terminal,
+        "weights": None,
+        "dtype": np.dtype(dtype).name,
+    }
+
+    if weights is not None:
+        w = np.asarray(pd.Series(weights)[tickers], dtype=np.float64)
+        params["weights"] = w
+        params["pf_mu"] = w @ mu
+        params["pf_sigma"] = max(np.sqrt(cov.quad(w)), 1e-12)
+
+    n_chunks = -(-num_simulations // chunk_size)
+    tasks = []
+    for j, seed_seq in enumerate(_chunk_seeds(seed, n_chunks)):
+        start = j * chunk_size
+        chunk_params = dict(params, keep_paths=max(0, keep_paths - start))
+        tasks.append((min(chunk_size, num_simulations - start), chunk_params, seed_seq))
+
+    # Chunks are merged in order, so sums are identical for any worker count;
+    # each is folded in as it arrives and then released
+    total = reduce(_merge_accumulators, _run_tasks(_simulate_chunk, tasks, workers), None)
+
+    return _summarize(total, params, tickers, prices, quantiles, portfolio_value)
+
+
+def _summarize(total, params, tickers, prices, quantiles, portfolio_value):
+    """Turn merged accumulators into price bands, quantiles and P&L stats."""
+
+    mu, sigma = params["mu"], params["sigma"]
+    num_days, bins = params["num_days"], params["bins"]
+    n = total["n"]
+    t = np.arange(1, num_days + 1)[:, None]
+
+    z = _histogram_quantiles(total["band_counts"], quantiles, bins)
+    bands = prices * np.exp(mu * t + sigma * np.sqrt(t) * z)
+
+    stored_prices = prices.astype(params["dtype"])
+
+    terminal_mean = total["terminal_sum"] / n
+    terminal_var = np.maximum(total["terminal_sumsq"] / n - terminal_mean ** 2, 0.0)
+
+    result = {
+        "tickers": tickers,
+        "quantiles": np.asarray(quantiles),
+        "bands": bands,
+        "terminal_quantiles": pd.DataFrame(bands[:, -1], index=quantiles, columns=tickers),
+        "terminal_mean": pd.Series(prices * terminal_mean, index=tickers),
+        "terminal_std": pd.Series(prices * np.sqrt(terminal_var), index=tickers),
+        "portfolio": None,
+        "sample_paths": None if total["sample"] is None else total["sample"] * stored_prices,
+        "terminal_prices": None if total["terminal"] is None else total["terminal"] * stored_prices,
+    }
+
+    if params["weights"] is not None:
+        pf_z = _histogram_quantiles(total["pf_counts"], quantiles, bins)
+        pf_growth_q = np.exp(params["pf_mu"] * num_days + params["pf_sigma"] * np.sqrt(num_days) * pf_z)
+        pf_mean = total["pf_sum"] / n
+        pf_var = max(total["pf_sumsq"] / n - pf_mean ** 2, 0.0)
+
+        result["portfolio"] = {
+            "mean_pnl": portfolio_value * (pf_mean - 1.0),
+            "std_pnl": portfolio_value * np.sqrt(pf_var),
+            "pnl_quantiles": pd.Series(portfolio_value * (pf_growth_q - 1.0), index=quantiles),
+            "prob_loss": total["pf_losses"] / n,
+        }
+
+    return result
+
+
+def _horizon_chunk(n_paths, params, seed_seq):
+    """Simple returns of one chunk of correlated paths at each horizon.
+
+    Draws are the same as _simulate_chunk's for the same seed, so a
+    horizon equal to num_days matches simulate_correlated_paths. Returns
+    (n_horizons, n_paths, n_series) with the daily-rebalanced portfolio as
+    the last series if weights are given: each day's portfolio return is
+    the weighted sum of the assets' simple returns, compounded over the
+    horizon.
+    """
+
+    rng = np.random.default_rng(seed_seq)
+    mu, cov, weights = params["mu"], params["cov"], params["weights"]
+    horizons = params["horizons"]
+    n_assets = len(mu)
+
+    out = np.empty((len(horizons), n_paths, n_assets + (weights is not None)))
+    slots = {h: i for i, h in enumerate(horizons)}
+    log_ret = np.zeros((n_paths, n_assets))
+    pf_log = np.zeros(n_paths)
+    shocks = np.empty((n_paths, cov.shock_dim))
+
+    for day in range(1, max(horizons) + 1):
+        rng.standard_normal(out=shocks)
+        step = cov.transform_shocks(shocks)
+        log_ret += step
+        log_ret += mu
+        if weights is not None:
+            step += mu
+            pf_log += np.log1p(np.expm1(step, out=step) @ weights)
+
+        if day in slots:
+            returns = out[slots[day]]
+            np.expm1(log_ret, out=returns[:, :n_assets])
+            if weights is not None:
+                np.expm1(pf_log, out=returns[:, -1])
+
+    return out
+
+
+def simulate_horizon_returns(
+    daily_returns,
+    horizons,
+    weights=None,
+    num_simulations: int = 100_000,
+    chunk_size: int = 10_000,
+    seed=None,
+    workers: int = 1,
+    cov_model=None,
+):
+    """
+    Correlated Monte Carlo returns at several horizons, one chunk at a time.
+
+    Paths follow the same model and per-chunk streams as
+    simulate_correlated_paths (same seed and chunk_size give the same
+    paths), but instead of price bands each chunk yields the simple
+    return of every path at every horizon, so callers can stream them into
+    bounded-memory summaries (see analysis.risk.simulated_risk).
+
+    Yields (n_horizons, n_paths, n_series) arrays in chunk order; the
+    series are the tickers, plus the daily-rebalanced portfolio last if
+    weights (ticker -> weight) are given, as in analysis.risk.
+    """
+
+    panel = as_returns_panel(daily_returns)
+    tickers = list(panel.tickers)
+    if cov_model is None:
+        cov_model = sample_covariance(panel)
+
+    params = {
+        "mu": panel.mean(),
+        "cov": as_covariance_model(cov_model).prepare_sampling(),
+        "horizons": tuple(int(h) for h in horizons),
+        "weights": None,
+    }
+    if weights is not None:
+        params["weights"] = np.asarray(pd.Series(weights)[tickers], dtype=np.float64)
+
+    n_chunks = -(-num_simulations // chunk_size)
+    tasks = [
+        (min(chunk_size, num_simulations - j * chunk_size), params, seed_seq)
+        for j, seed_seq in enumerate(_chunk_seeds(seed, n_chunks))
+    ]
+    yield from _run_tasks(_horizon_chunk, tasks, workers)
+
+
+def _terminal_estimates(terminal, last_price, quantiles, expected_terminal=None):
+    """Mean, probability of loss and quantiles of terminal prices.
+
+    With expected_terminal (the analytic GBM mean) the terminal price is
+    used as a control variate for the loss probability and the CDF behind
+    the quantiles, which are regression-adjusted. The mean stays the plain
+    sample mean: a control on S_T would just return its own known mean.
+    """
+
+    terminal = np.sort(terminal)
+    n = len(terminal)
+    mean = terminal.mean()
+    loss = terminal < last_price
+    prob_loss = loss.mean()
+    ranks = np.arange(1, n + 1) / n
+
+    if expected_terminal is None:
+        cdf = ranks
+    else:
+        var = terminal.var()
+        shift = mean - expected_terminal
+        if var > 0:
+            # beta(x) = cov(1{S <= x}, S) / var(S) for every sample point x
+            partial = np.cumsum(terminal) / n - ranks * mean
+            cdf = np.maximum.accumulate(ranks - partial / var * shift)
+            prob_loss = prob_loss - ((terminal[loss].sum() / n - prob_loss * mean) / var) * shift
+        else:
+            cdf = ranks
+
+    idx = np.minimum(np.searchsorted(cdf, quantiles, side="left"), n - 1)
+    return mean, prob_loss, terminal[idx]
+
+
+@profiled()
+def estimate_terminal_distribution(
+    last_price: float,
+    daily_returns: pd.Series,
+    num_days: int = 252,
+    num_simulations: int = 5000,
+    method: str = "plain",
+    quantiles=(0.01, 0.05, 0.5, 0.95, 0.99),
+    replicate_size: int = 512,
+    target_stderr=None,
+    target_stat="mean",
+    max_simulations: int = 1_000_000,
+    keep_paths: int = 0,
+    seed=None
+):
+    """
+    Terminal price estimates with achieved standard errors.
+
+    Simulations run as independent replicates of `replicate_size` paths
+    (antithetic pairs stay within a replicate; each Sobol replicate is an
+    independent scrambling). Point estimates use all paths and standard
+    errors come from the spread of the replicate estimates.
+
+    Parameters:
+        method: "plain", "antithetic", "control_variate" (terminal price as
+            control, using the analytic GBM mean, for the loss probability
+            and quantiles; the mean and its standard error are the plain
+            Monte Carlo ones) or "sobol"
+        replicate_size: paths per replicate (a power of two for "sobol")
+        target_stderr: if set, keep adding replicates until the standard
+            error of target_stat is at or below it (or max_simulations)
+        target_stat: "mean", "prob_loss" or one of the quantile levels
+        keep_paths: number of price paths to return for plotting
+
+    Returns dict with:
+    - mean, mean_se: terminal price expectation and its standard error
+    - prob_loss, prob_loss_se: P(final price < last price)
+    - quantiles, quantile_se: Series indexed by quantile level
+    - num_simulations, method, converged
+    - paths: (keep_paths, num_days) price paths, or None
+    """
+
+    if method not in ESTIMATOR_METHODS:
+        raise ValueError(f"Unknown method: {method}")
+
+    mu = daily_returns.mean()
+    sigma = daily_returns.std()
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    sampling = "plain" if method == "control_variate" else method
+    expected = None
+    if method == "control_variate":
+        expected = last_price * np.exp(num_days * (mu + 0.5 * sigma ** 2))
+
+    min_replicates = 8
+    n_reps = max(min_replicates, -(-num_simulations // replicate_size))
+    max_reps = max(n_reps, max_simulations // replicate_size)
+
+    terminals, rep_stats, paths = [], [], None
+    converged = target_stderr is None
+
+    while True:
+        seeds = _chunk_seeds(seed, n_reps)[len(terminals):]
+        for seed_seq in seeds:
+            shocks = _standard_shocks(sampling, replicate_size, num_days, seed_seq)
+            log_paths = np.cumsum(mu + sigma * shocks, axis=1)
+            if paths is None and keep_paths:
+                paths = last_price * np.exp(log_paths[:keep_paths])
+
+            terminal = last_price * np.exp(log_paths[:, -1])
+            terminals.append(terminal)
+            rep_stats.append(_terminal_estimates(terminal, last_price, quantiles, expected))
+
+        n_done = len(terminals)
+        rep_mean = np.array([r[0] for r in rep_stats])
+        rep_loss = np.array([r[1] for r in rep_stats])
+        rep_q = np.array([r[2] for r in rep_stats])
+
+        scale = np.sqrt(n_done)
+        mean_se = rep_mean.std(ddof=1) / scale
+        loss_se = rep_loss.std(ddof=1) / scale
+        q_se = rep_q.std(axis=0, ddof=1) / scale
+
+        if target_stderr is None:
+            break
+
+        if target_stat == "mean":
+            achieved = mean_se
+        elif target_stat == "prob_loss":
+            achieved = loss_se
+        else:
+            achieved = q_se[int(np.argmin(np.abs(quantiles - target_stat)))]
+
+        if achieved <= target_stderr:
+            converged = True
+            break
+        if n_done >= max_reps:
+            break
 
-    # Random normal returns for all simulations
-    random_returns = np.random.normal(mu, sigma, (num_simulations, num_days))
+        # Standard error falls like 1/sqrt(n): jump to the projected size
+        needed = int(np.ceil(n_done * (achieved / target_stderr) ** 2))
+        n_reps = min(max_reps, max(n_done + 1, needed))
 
-    # Convert returns to price paths
-    price_paths = last_price * np.exp(np.cumsum(random_returns, axis=1))
+    mean, prob_loss, q_values = _terminal_estimates(
+        np.concatenate(terminals), last_price, quantiles, expected
+    )
 
-    return price_paths
+    return {
+        "method": method,
+        "num_simulations": n_done * replicate_size,
+        "mean": mean,
+        "mean_se": mean_se,
+        "prob_loss": prob_loss,
+        "prob_loss_se": loss_se,
+        "quantiles": pd.Series(q_values, index=quantiles),
+        "quantile_se": pd.Series(q_se, index=quantiles),
+        "converged": converged,
+        "paths": paths,
+    }
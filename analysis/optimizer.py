@@ -1,24 +1,135 @@
 """handle all optimization function"""
 
 import numpy as np
-from scipy.optimize import minimize
+import pandas as pd
+from analysis.covariance import as_covariance_model, sample_covariance
+from analysis.panel import as_returns_panel
 from config.settings import RISK_FREE_RATE, TRADING_DAYS
+from utils.profiler import count, profiled
+
+
+@profiled()
+def solve_tangency_qp(excess_returns, cov_matrix, initial_weights=None, tol=1e-10, max_iter=None):
+    '''max-Sharpe long-only weights via the convex QP reformulation
+
+    With y = w / (excess'w), maximizing Sharpe is equivalent to
+        min y'Cy   s.t.  excess'y = 1,  y >= 0
+    which is solved with a primal active-set method; w = y / sum(y).
+    cov_matrix may be an array/DataFrame or a CovarianceModel; only the
+    free block and matrix-vector products are used.
+    initial_weights (e.g. the previous solution) seeds the active set.
+    Returns (weights, success, iterations).
+    '''
+
+    a = np.asarray(excess_returns, dtype=np.float64)
+    cov = as_covariance_model(cov_matrix)
+    n = len(a)
+    max_iter = max_iter or 10 * n + 50
+
+    if not np.any(a > 0):
+        return None, False, 0
+
+    # Feasible start: the warm start rescaled onto excess'y = 1 when it has
+    # positive excess return, else the asset with the best standalone Sharpe
+    y = None
+    if initial_weights is not None:
+        w0 = np.clip(np.asarray(initial_weights, dtype=np.float64), 0.0, None)
+        if w0 @ a > 0:
+            y = w0 / (w0 @ a)
+    if y is None:
+        sharpe = np.where(a > 0, a / np.sqrt(cov.diag()), -np.inf)
+        k = int(np.argmax(sharpe))
+        y = np.zeros(n)
+        y[k] = 1.0 / a[k]
+
+    free = y > 0
+
+    for iteration in range(1, max_iter + 1):
+        idx = np.flatnonzero(free)
+        sol = np.linalg.solve(cov.submatrix(idx, idx), a[idx])
+        lam = 1.0 / (a[idx] @ sol)
+        target = np.zeros(n)
+        target[idx] = lam * sol
+
+        if np.all(target[idx] >= -tol):
+            y = np.clip(target, 0.0, None)
+            # Multipliers of the bounds: nu = Cy - lam * a must be >= 0
+            nu = cov.matvec(y) - lam * a
+            nu[free] = 0.0
+            k = int(np.argmin(nu))
+            if nu[k] >= -tol * max(1.0, abs(lam)):
+                return y / y.sum(), True, iteration
+            free[k] = True
+        else:
+            # Step toward the subproblem solution until a weight hits zero
+            neg = idx[target[idx] < 0]
+            steps = y[neg] / (y[neg] - target[neg])
+            step = steps.min()
+            y = y + step * (target - y)
+            y[neg[steps <= step + tol]] = 0.0
+            y = np.clip(y, 0.0, None)
+            free = y > tol
+
+    return y / y.sum(), False, max_iter
+
 
 class PortfolioOptimizer:
     '''optimize portfolio weight'''
 
-    def __init__(self, daily_returns, risk_free_rate = RISK_FREE_RATE):
+    def __init__(self, daily_returns, risk_free_rate = RISK_FREE_RATE, cov_model = None):
+        # A ReturnsPanel shares its cached mean/covariance with other modules
+        panel = as_returns_panel(daily_returns)
         self.daily_returns = daily_returns
         self.risk_free_rate = risk_free_rate
-        self.mean_returns = daily_returns.mean() * TRADING_DAYS
-        self.cov_matrix = daily_returns.cov() * TRADING_DAYS
-        self.n_assets = len(daily_returns.columns)
+        self.mean_returns = panel.mean_series() * TRADING_DAYS
+        self.n_assets = panel.n_assets
+        self.tickers = list(panel.tickers)
+
+        # Daily covariance model (dense sample covariance unless given)
+        if cov_model is None:
+            cov_model = sample_covariance(panel)
+        self.cov_model = as_covariance_model(cov_model).scaled(TRADING_DAYS)
+
+        self._mu = self.mean_returns.to_numpy(dtype=np.float64)
+        self.last_weights = None
+
+    @property
+    def cov_matrix(self):
+        '''annualized covariance as a DataFrame (dense)'''
+
+        return pd.DataFrame(self.cov_model.dense(), index=self.tickers, columns=self.tickers)
+
+    @classmethod
+    def from_moments(cls, mean_returns, cov_matrix, tickers, risk_free_rate = RISK_FREE_RATE):
+        '''build from daily mean/covariance instead of a returns history
+
+        cov_matrix may be an array or a CovarianceModel.
+        '''
+
+        optimizer = cls.__new__(cls)
+        optimizer.daily_returns = None
+        optimizer.risk_free_rate = risk_free_rate
+        index = tickers if isinstance(tickers, pd.Index) else pd.Index(tickers)
+        optimizer.tickers = list(index)
+        optimizer.n_assets = len(index)
+
+        optimizer._mu = np.asarray(mean_returns, dtype=np.float64) * TRADING_DAYS
+        optimizer.cov_model = as_covariance_model(cov_matrix).scaled(TRADING_DAYS)
+        optimizer.mean_returns = pd.Series(optimizer._mu, index=index, copy=False)
+        optimizer.last_weights = None
+        return optimizer
+
+    @classmethod
+    def from_running_moments(cls, moments, risk_free_rate = RISK_FREE_RATE):
+        '''build from a RunningMoments state instead of a returns history'''
+
+        return cls.from_moments(moments.mean, moments.cov(), moments.tickers, risk_free_rate)
 
     def portfolio_stats(self, weights):
         '''calculate return, volatility, and Sharpe'''
 
-        portfolio_return = np.dot(weights, self.mean_returns)
-        portfolio_std = np.sqrt(np.dot(weights.T, np.dot(self.cov_matrix, weights)))
+        portfolio_return = np.dot(weights, self._mu)
+        portfolio_std = np.sqrt(self.cov_model.quad(weights))
         sharpe_ratio = (portfolio_return - self.risk_free_rate) / portfolio_std
         return portfolio_return, portfolio_std, sharpe_ratio
 
@@ -27,21 +138,58 @@ class PortfolioOptimizer:
 
         return -self.portfolio_stats(weights)[2]
 
-    def optimize_sharpe(self):
-        '''optimize for for max sharpe ratio'''
-
-        constraints = {'type': 'eq', 'fun': lambda x: np.sum(x) - 1}
+    def _negative_sharpe_grad(self, weights):
+        '''exact gradient of the negative sharpe ratio'''
+
+        cov_w = self.cov_model.matvec(weights)
+        std = np.sqrt(weights @ cov_w)
+        excess = weights @ self._mu - self.risk_free_rate
+        return -(self._mu / std - excess * cov_w / std ** 3)
+
+    @profiled()
+    def optimize_sharpe(self, method='slsqp', initial_weights=None):
+        '''optimize for for max sharpe ratio
+
+        method: 'slsqp' (analytic gradients) or 'qp' (convex reformulation
+        solved by an active-set method; falls back to SLSQP when no asset
+        beats the risk-free rate)
+        initial_weights: warm start, e.g. the previous optimal weights
+        '''
+
+        if method == 'qp':
+            weights, success, iterations = solve_tangency_qp(
+                self._mu - self.risk_free_rate, self.cov_model, initial_weights
+            )
+            count(nit=iterations)
+            if weights is not None:
+                self.last_weights = weights
+                return self._build_results(weights, 'Sharpe Ratio Optimization', success)
+        elif method != 'slsqp':
+            raise ValueError(f"Unknown optimization method: {method}")
+
+        # Only the SLSQP path needs scipy.optimize; load it on first use
+        from scipy.optimize import minimize
+
+        constraints = {
+            'type': 'eq',
+            'fun': lambda x: np.sum(x) - 1,
+            'jac': lambda x: np.ones_like(x),
+        }
         bounds = tuple((0, 1) for _ in range(self.n_assets))
-        initial_weights = np.array([1 / self.n_assets] * self.n_assets)
+        if initial_weights is None:
+            initial_weights = np.array([1 / self.n_assets] * self.n_assets)
 
         result = minimize(
             self._negative_sharpe,
-            initial_weights,
+            np.asarray(initial_weights, dtype=np.float64),
+            jac=self._negative_sharpe_grad,
             method='SLSQP',
             bounds=bounds,
             constraints=constraints
         )
 
+        count(nit=result.nit, nfev=result.nfev, njev=result.njev)
+        self.last_weights = result.x
         return self._build_results(result.x, 'Sharpe Ratio Optimization', result.success)
 
     def equal_weight(self):
@@ -58,7 +206,7 @@ class PortfolioOptimizer:
 
         return {
             'method': method_name,
-            'weights': dict(zip(self.daily_returns.columns, weights)),
+            'weights': dict(zip(self.tickers, weights)),
             'expected_annual_return': pf_return,
             'annual_volatility': pf_vol,
             'sharpe_ratio': pf_sharpe,
@@ -0,0 +1,239 @@
+"""Aligned daily-returns panel shared by the analysis modules"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+
+class ReturnsPanel:
+    """
+    Daily returns of many tickers on one date grid, built once per run.
+
+    - values: C-contiguous float64 (n_days, n_assets); NaN where a ticker
+      has no return that day (not listed yet, halted, missing quote)
+    - mask: bool array, True where a return is observed
+    - dates, tickers: pandas Index objects for the rows and columns
+    - market: float64 (n_days,) market returns on the same dates (NaN
+      where the market has none), or None
+
+    Days are only dropped when no ticker traded, so one missing quote
+    no longer removes that day for every ticker. Mean, standard deviation
+    and covariance are computed once over the observed values (pairwise
+    for the covariance, like DataFrame.cov()) and cached, and the analysis
+    functions read `values` directly instead of re-aligning pandas objects.
+    """
+
+    def __init__(self, values, dates, tickers, market=None):
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.dates = pd.Index(dates)
+        self.tickers = pd.Index(tickers)
+        self.mask = ~np.isnan(self.values)
+        self.market = None if market is None else np.ascontiguousarray(market, dtype=np.float64)
+        self._cache = {}
+
+        if self.values.shape != (len(self.dates), len(self.tickers)):
+            raise ValueError(
+                f"Returns of shape {self.values.shape} do not match "
+                f"{len(self.dates)} dates x {len(self.tickers)} tickers."
+            )
+        if self.market is not None and self.market.shape != (len(self.dates),):
+            raise ValueError("Market returns must have one value per date.")
+
+    @classmethod
+    def from_prices(cls, prices, market_returns=None):
+        """
+        Simple returns from a date x ticker price DataFrame. A return is
+        missing when either of its two prices is; days without any return
+        are dropped.
+        """
+
+        p = prices.to_numpy(dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = p[1:] / p[:-1] - 1
+        keep = ~np.isnan(returns).all(axis=1)
+
+        panel = cls(returns[keep], prices.index[1:][keep], prices.columns)
+        return panel if market_returns is None else panel.with_market(market_returns)
+
+    @classmethod
+    def from_returns(cls, daily_returns, market_returns=None):
+        """Wrap a returns DataFrame (NaN = missing) and optionally a market Series."""
+
+        panel = cls(daily_returns.to_numpy(dtype=np.float64), daily_returns.index,
+                    daily_returns.columns)
+        return panel if market_returns is None else panel.with_market(market_returns)
+
+    def with_market(self, market_returns):
+        """
+        Same panel (values shared, not copied) with market returns aligned
+        to its dates.
+        """
+
+        if isinstance(market_returns, pd.DataFrame):
+            market_returns = market_returns.iloc[:, 0]
+        if isinstance(market_returns, pd.Series):
+            market = market_returns.reindex(self.dates).to_numpy(dtype=np.float64)
+        else:
+            market = np.asarray(market_returns, dtype=np.float64)
+
+        panel = copy.copy(self)
+        panel.market = np.ascontiguousarray(market)
+        if panel.market.shape != (self.n_days,):
+            raise ValueError("Market returns must have one value per date.")
+        return panel
+
+    @property
+    def n_days(self):
+        return self.values.shape[0]
+
+    @property
+    def n_assets(self):
+        return self.values.shape[1]
+
+    @property
+    def has_missing(self):
+        '''True if any ticker lacks a return on any day'''
+
+        if "has_missing" not in self._cache:
+            self._cache["has_missing"] = not self.mask.all()
+        return self._cache["has_missing"]
+
+    def _cached(self, name, func):
+        '''compute a derived quantity once'''
+
+        if name not in self._cache:
+            self._cache[name] = func()
+        return self._cache[name]
+
+    # VIEWS
+
+    def to_frame(self):
+        """The returns as a DataFrame backed by `values` (no copy)."""
+
+        return pd.DataFrame(self.values, index=self.dates, columns=self.tickers, copy=False)
+
+    def market_series(self):
+        """Market returns as a Series on the panel dates."""
+
+        if self.market is None:
+            raise ValueError("This panel has no market returns.")
+        return pd.Series(self.market, index=self.dates, name="Market", copy=False)
+
+    def column(self, ticker):
+        """One ticker's returns (a view, NaN where missing)."""
+
+        return self.values[:, self.tickers.get_loc(ticker)]
+
+    def pair(self, ticker):
+        """
+        (stock, market) return arrays on the days both are observed:
+        views when nothing is missing, otherwise compact copies.
+        """
+
+        if self.market is None:
+            raise ValueError("This panel has no market returns.")
+        stock = self.column(ticker)
+        both = ~(np.isnan(stock) | np.isnan(self.market))
+        if both.all():
+            return stock, self.market
+        return stock[both], self.market[both]
+
+    def complete(self, market=False):
+        """
+        Panel of the days on which every ticker (and, with market=True,
+        the market) has a return. Returns self when no day is missing, so
+        estimators that need a full matrix pay nothing in the common case.
+        """
+
+        rows = self.mask.all(axis=1)
+        if market:
+            if self.market is None:
+                raise ValueError("This panel has no market returns.")
+            rows &= ~np.isnan(self.market)
+        if rows.all():
+            return self
+
+        return ReturnsPanel(
+            self.values[rows], self.dates[rows], self.tickers,
+            None if self.market is None else self.market[rows],
+        )
+
+    def subset(self, tickers):
+        """Panel restricted to `tickers` (in that order), keeping the market."""
+
+        cols = self.tickers.get_indexer(tickers)
+        if (cols < 0).any():
+            missing = [t for t, c in zip(tickers, cols) if c < 0]
+            raise KeyError(f"Tickers not in panel: {missing}")
+        return ReturnsPanel(self.values[:, cols], self.dates, self.tickers[cols], self.market)
+
+    # MOMENTS (daily, cached)
+
+    def mean(self):
+        """Mean daily return per ticker over its observed days."""
+
+        def compute():
+            if not self.has_missing:
+                return self.values.mean(axis=0)
+            return np.nanmean(self.values, axis=0)
+
+        return self._cached("mean", compute)
+
+    def std(self):
+        """Sample standard deviation (ddof=1) per ticker over its observed days."""
+
+        def compute():
+            if not self.has_missing:
+                return self.values.std(axis=0, ddof=1)
+            return np.nanstd(self.values, axis=0, ddof=1)
+
+        return self._cached("std", compute)
+
+    def cov(self):
+        """
+        Sample covariance (ddof=1). With missing values each pair uses the
+        days on which both tickers are observed, as DataFrame.cov() does.
+        """
+
+        def compute():
+            x = self.values - self.mean()
+            if not self.has_missing:
+                return x.T @ x / (self.n_days - 1)
+
+            # Pairwise-complete co-moments from three products: pair counts,
+            # cross sums and the per-pair sums of each side
+            observed = self.mask.astype(np.float64)
+            x = np.where(self.mask, x, 0.0)
+            counts = observed.T @ observed
+            sums = x.T @ observed
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return (x.T @ x - sums * sums.T / counts) / (counts - 1)
+
+        return self._cached("cov", compute)
+
+    def mean_series(self):
+        """mean() as a Series indexed by ticker."""
+
+        return pd.Series(self.mean(), index=self.tickers)
+
+    def cov_frame(self):
+        """cov() as a ticker x ticker DataFrame."""
+
+        return pd.DataFrame(self.cov(), index=self.tickers, columns=self.tickers)
+
+
+def as_returns_panel(daily_returns, market_returns=None):
+    """
+    Accept a ReturnsPanel or a returns DataFrame (as the analysis functions
+    did before) and return a panel, attaching market returns if given.
+    """
+
+    if isinstance(daily_returns, ReturnsPanel):
+        panel = daily_returns
+    else:
+        panel = ReturnsPanel.from_returns(daily_returns)
+
+    if market_returns is not None:
+        panel = panel.with_market(market_returns)
+    return panel
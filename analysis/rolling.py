@@ -0,0 +1,219 @@
+"""Multi-window rolling risk metrics from one cumulative-sum pass"""
+
+import numpy as np
+import pandas as pd
+
+from analysis.capm import _daily_rf
+from analysis.panel import as_returns_panel
+from config.settings import RISK_FREE_RATE, TRADING_DAYS
+from utils.profiler import profiled
+
+DEFAULT_WINDOWS = (20, 60, 120, 252)
+METRICS = ("volatility", "sharpe", "downside_deviation", "max_drawdown")
+
+
+def _window_diff(prefix, window):
+    """Trailing-window sums from prefix sums that start with a zero row.
+
+    Row t holds the sum of input rows t-window+1 .. t; the first window-1
+    rows are NaN.
+    """
+
+    out = np.empty((len(prefix) - 1,) + prefix.shape[1:])
+    out[:window - 1] = np.nan
+    np.subtract(prefix[window:], prefix[:-window], out=out[window - 1:])
+    return out
+
+
+def _rolling_drawdown(levels, windows):
+    """Largest fall of `levels` inside every trailing window, for each window.
+
+    levels: (n_days + 1, n) log wealth, starting at the level before the
+    first return. A window of w returns spans w + 1 levels, which are split
+    into power-of-two blocks (the binary digits of w + 1, smallest block
+    last). Block k is built from block k-1 by doubling: its max, min and
+    internal fall come from its two halves. Every window folds in its
+    blocks right to left, so only the current block level and one running
+    (min, fall) pair per window are held, and the cost is
+    O(n_days * n * log w).
+
+    Returns dict window -> (n_days - w + 1, n) falls in log units.
+    """
+
+    n_points = len(levels)
+    state = {}
+    covered = dict.fromkeys(windows, 0)
+
+    top, bottom, fall = levels, levels, np.zeros_like(levels)
+    size = 1
+    while True:
+        for w in windows:
+            if not (w + 1) & size:
+                continue
+            covered[w] += size
+            start = w + 1 - covered[w]
+            rows = slice(start, start + n_points - w)
+            if w not in state:
+                state[w] = (bottom[rows].copy(), fall[rows].copy())
+                continue
+            low, drop = state[w]
+            drop = np.maximum(np.maximum(fall[rows], drop), top[rows] - low)
+            state[w] = (np.minimum(bottom[rows], low), drop)
+
+        if 2 * size > max(windows) + 1:
+            break
+        fall = np.maximum(np.maximum(fall[:-size], fall[size:]), top[:-size] - bottom[size:])
+        top = np.maximum(top[:-size], top[size:])
+        bottom = np.minimum(bottom[:-size], bottom[size:])
+        size *= 2
+
+    return {w: drop for w, (_, drop) in state.items()}
+
+
+@profiled()
+def rolling_metrics(daily_returns, windows=DEFAULT_WINDOWS, risk_free_rate=RISK_FREE_RATE,
+                    pairs=(), dtype="float64"):
+    """
+    Rolling volatility, Sharpe ratio, downside deviation, max drawdown and
+    pairwise correlation for several windows at once.
+
+    Returns, squared returns, squared shortfalls below the risk-free rate,
+    log returns and pairwise cross-products are stacked into one array and
+    cumulatively summed once; every window's sums are then differences of
+    that prefix sum, so each metric costs O(1) per ticker, day and window
+    whatever the window length. Max drawdown uses the log-wealth prefix
+    sum with a doubling scheme (see _rolling_drawdown).
+
+    daily_returns: returns DataFrame or ReturnsPanel. A window containing a
+        missing return is NaN for that ticker (and its pairs).
+    windows: window lengths in trading days
+    risk_free_rate: annual rate; Sharpe uses excess returns and downside
+        deviation the shortfall below it
+    pairs: (ticker, ticker) tuples to correlate (none by default); "all"
+        correlates every pair, which costs n_days * n(n-1)/2 values per
+        window and grows the prefix-sum buffer quadratically
+    dtype: storage dtype of the results (sums are always float64)
+
+    Volatility, Sharpe and downside deviation are annualized; max drawdown
+    is the largest peak-to-trough loss inside the window as a positive
+    fraction (0.25 = -25%).
+
+    Returns dict with:
+    - windows, dates, tickers, pairs
+    - volatility, sharpe, downside_deviation, max_drawdown:
+      (n_windows, n_days, n_tickers) arrays, NaN before a window fills
+    - correlation: (n_windows, n_days, n_pairs) array
+    """
+
+    panel = as_returns_panel(daily_returns)
+    windows = tuple(dict.fromkeys(int(w) for w in windows))
+    if min(windows) < 2 or max(windows) > panel.n_days:
+        raise ValueError(f"Windows must be between 2 and {panel.n_days} days.")
+
+    tickers = panel.tickers
+    if isinstance(pairs, str):
+        if pairs != "all":
+            raise ValueError(f"Unknown pairs option '{pairs}'. Use 'all' or a list of pairs.")
+        left, right = np.triu_indices(panel.n_assets, k=1)
+    else:
+        pairs = list(pairs)
+        left = tickers.get_indexer([a for a, _ in pairs])
+        right = tickers.get_indexer([b for _, b in pairs])
+        if (left < 0).any() or (right < 0).any():
+            raise KeyError("Correlation pairs refer to tickers not in the returns.")
+    pairs = list(zip(tickers[left], tickers[right]))
+
+    n, n_pairs = panel.n_assets, len(pairs)
+    rf_daily = _daily_rf(risk_free_rate)
+    missing = ~panel.mask
+    has_gaps = panel.has_missing
+    returns = np.where(missing, 0.0, panel.values) if has_gaps else panel.values
+
+    # Shift by the full-sample means so the prefix sums stay well conditioned
+    shift = panel.mean()
+    x = returns - shift
+    if has_gaps:
+        x[missing] = 0.0
+
+    # One prefix-sum buffer: blocks of columns for every summed quantity
+    blocks = {"x": n, "xx": n, "down": n, "log": n, "xy": n_pairs, "gaps": n if has_gaps else 0}
+    prefix = np.zeros((panel.n_days + 1, sum(blocks.values())))
+    cols, start = {}, 0
+    for name, width in blocks.items():
+        cols[name] = slice(start, start + width)
+        start += width
+
+    body = prefix[1:]
+    body[:, cols["x"]] = x
+    np.multiply(x, x, out=body[:, cols["xx"]])
+    shortfall = np.minimum(returns - rf_daily, 0.0, out=body[:, cols["down"]])
+    shortfall *= shortfall
+    np.log1p(returns, out=body[:, cols["log"]])
+    np.multiply(x[:, left], x[:, right], out=body[:, cols["xy"]])
+    if has_gaps:
+        body[:, cols["gaps"]] = missing
+    del x, shortfall
+    np.cumsum(prefix, axis=0, out=prefix)
+
+    drawdowns = _rolling_drawdown(prefix[:, cols["log"]], windows)
+
+    shape = (len(windows), panel.n_days)
+    result = {
+        "windows": windows,
+        "dates": panel.dates,
+        "tickers": tickers,
+        "pairs": pairs,
+        "volatility": np.empty(shape + (n,), dtype=dtype),
+        "sharpe": np.empty(shape + (n,), dtype=dtype),
+        "downside_deviation": np.empty(shape + (n,), dtype=dtype),
+        "max_drawdown": np.empty(shape + (n,), dtype=dtype),
+        "correlation": np.empty(shape + (n_pairs,), dtype=dtype),
+    }
+
+    for i, w in enumerate(windows):
+        sums = _window_diff(prefix, w)
+        sx, sxx = sums[:, cols["x"]], sums[:, cols["xx"]]
+
+        # Sample variance (ddof=1) of each window; clipped at zero against
+        # rounding in the differenced sums
+        var = np.maximum(sxx - sx * sx / w, 0.0)
+        vol = np.sqrt(var / (w - 1))
+        excess = sx / w + (shift - rf_daily)
+
+        drawdown = np.full((panel.n_days, n), np.nan)
+        drawdown[w - 1:] = -np.expm1(-drawdowns.pop(w))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = excess * np.sqrt(TRADING_DAYS) / vol
+            sxy = sums[:, cols["xy"]]
+            corr = (sxy - sx[:, left] * sx[:, right] / w) / np.sqrt(var[:, left] * var[:, right])
+
+        values = {
+            "volatility": vol * np.sqrt(TRADING_DAYS),
+            "sharpe": sharpe,
+            "downside_deviation": np.sqrt(sums[:, cols["down"]] * (TRADING_DAYS / w)),
+            "max_drawdown": drawdown,
+        }
+        if has_gaps:
+            gaps = sums[:, cols["gaps"]] > 0
+            for metric in values.values():
+                metric[gaps] = np.nan
+            corr[gaps[:, left] | gaps[:, right]] = np.nan
+
+        for name, metric in values.items():
+            result[name][i] = metric
+        result["correlation"][i] = corr
+
+    return result
+
+
+def metric_frame(metrics, name, window):
+    """
+    One metric of rolling_metrics() for one window as a date x ticker
+    DataFrame (date x pair for "correlation"), backed by the result array.
+    """
+
+    i = metrics["windows"].index(window)
+    columns = pd.Index([f"{a}/{b}" for a, b in metrics["pairs"]]) if name == "correlation" \
+        else metrics["tickers"]
+    return pd.DataFrame(metrics[name][i], index=metrics["dates"], columns=columns, copy=False)
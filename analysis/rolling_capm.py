@@ -0,0 +1,199 @@
+"""Rolling and incremental CAPM regressions"""
+
+import numpy as np
+import pandas as pd
+
+from analysis.capm import _daily_rf
+from analysis.panel import as_returns_panel
+from utils.profiler import profiled
+
+
+def _window_sums(values, window):
+    """Trailing-window sums along axis 0 from one cumulative-sum pass.
+
+    Row t holds the sum of rows t-window+1 .. t; the first window-1 rows
+    are NaN. The sums are computed in place: `values` is overwritten and
+    returned.
+    """
+
+    np.cumsum(values, axis=0, out=values)
+    values[window:] -= values[:-window]
+    values[:window - 1] = np.nan
+    return values
+
+
+@profiled()
+def rolling_capm(daily_returns, market_returns=None, window=60, risk_free_rate=0.02,
+                 dtype="float64"):
+    """
+    Rolling-window CAPM alpha, beta and R² for every ticker at once.
+
+    Running sums of x, y, x², y² and xy are differenced from prefix sums,
+    so each window costs O(1) per ticker regardless of its length.
+
+    daily_returns may be a ReturnsPanel carrying the market. Days without
+    a market return are skipped; a window containing a missing return for
+    a ticker is NaN for that ticker.
+
+    The prefix sums difference large numbers, so they are always taken in
+    float64 (in a handful of reused buffers); dtype="float32" only stores
+    the three results in float32, halving them at a relative rounding
+    error of 2^-24 (~6e-8).
+
+    Returns dict of date x ticker DataFrames: alpha, beta, r_squared.
+    """
+
+    panel = as_returns_panel(daily_returns, market_returns)
+    if panel.market is None:
+        raise ValueError("Rolling CAPM needs market returns.")
+
+    rf_daily = _daily_rf(risk_free_rate)
+    has_market = ~np.isnan(panel.market)
+    rows = slice(None) if has_market.all() else has_market
+    y = panel.values[rows] - rf_daily
+    x = panel.market[rows] - rf_daily
+    dates = panel.dates[rows]
+
+    missing = np.isnan(y)
+    has_gaps = missing.any()
+
+    # Shift by the full-sample means so prefix sums stay well conditioned
+    x_shift = x.mean()
+    y_shift = np.nanmean(y, axis=0) if has_gaps else y.mean(axis=0)
+    x = (x - x_shift)[:, None]
+    y -= y_shift
+    if has_gaps:
+        # Zeros keep the prefix sums finite; affected windows are blanked below
+        y[missing] = 0.0
+
+    sx = _window_sums(x.copy(), window)
+    sxx = _window_sums(x * x, window)
+    syy = _window_sums(y * y, window)
+    sxy = _window_sums(x * y, window)
+    sy = _window_sums(y, window)
+    del y
+
+    # Results overwrite the sums they are built from (same operations, so
+    # the values match an out-of-place computation bit for bit):
+    # sxy -> cov_xy -> r_squared, syy -> var_y, sy -> alpha
+    var_x = sxx - sx * sx / window
+    scratch = sx * sy
+    scratch /= window
+    cov_xy = np.subtract(sxy, scratch, out=sxy)
+    np.multiply(sy, sy, out=scratch)
+    scratch /= window
+    var_y = np.subtract(syy, scratch, out=syy)
+    del sxy, syy
+
+    beta = cov_xy / var_x
+    alpha = np.divide(sy, window, out=sy)
+    alpha += y_shift
+    np.multiply(beta, sx / window + x_shift, out=scratch)
+    alpha -= scratch
+    r_squared = np.multiply(beta, cov_xy, out=cov_xy)
+    r_squared /= var_y
+    del scratch, var_y, cov_xy
+
+    if has_gaps:
+        gaps = _window_sums(missing.astype(np.float64), window) > 0
+        for values in (alpha, beta, r_squared):
+            values[gaps] = np.nan
+
+    def _frame(values):
+        return pd.DataFrame(values.astype(dtype, copy=False), index=dates,
+                            columns=panel.tickers, copy=False)
+
+    return {
+        "alpha": _frame(alpha),
+        "beta": _frame(beta),
+        "r_squared": _frame(r_squared),
+    }
+
+
+class RollingCAPM:
+    """
+    Streaming rolling-window CAPM for many tickers.
+
+    Keeps a ring buffer of the last `window` observations and running sums
+    of the regression cross-products; each update() adds the newest day
+    and drops the oldest in O(n_tickers).
+    """
+
+    def __init__(self, tickers, window=60, risk_free_rate=0.02):
+        self.tickers = list(tickers)
+        self.window = window
+        self.rf_daily = _daily_rf(risk_free_rate)
+
+        n = len(self.tickers)
+        self._x = np.zeros(window)
+        self._y = np.zeros((window, n))
+        self._pos = 0
+        self.count = 0
+
+        self._sx = 0.0
+        self._sxx = 0.0
+        self._sy = np.zeros(n)
+        self._syy = np.zeros(n)
+        self._sxy = np.zeros(n)
+
+    def update(self, stock_returns, market_return):
+        """Add one day of returns (array ordered like tickers) and the market return."""
+
+        x = float(market_return) - self.rf_daily
+        y = np.asarray(stock_returns, dtype=np.float64) - self.rf_daily
+
+        if self.count >= self.window:
+            old_x = self._x[self._pos]
+            old_y = self._y[self._pos]
+            self._sx -= old_x
+            self._sxx -= old_x * old_x
+            self._sy -= old_y
+            self._syy -= old_y * old_y
+            self._sxy -= old_x * old_y
+
+        self._x[self._pos] = x
+        self._y[self._pos] = y
+        self._pos = (self._pos + 1) % self.window
+        self.count += 1
+
+        self._sx += x
+        self._sxx += x * x
+        self._sy += y
+        self._syy += y * y
+        self._sxy += x * y
+
+        # Re-sum the buffer once per wrap so add/subtract drift cannot build
+        # up; amortized this is still O(n_tickers) per update
+        if self._pos == 0:
+            self._resync()
+
+        return self.current()
+
+    def _resync(self):
+        '''recompute running sums exactly from the ring buffer'''
+
+        x = self._x[:, None]
+        self._sx = float(self._x.sum())
+        self._sxx = float(self._x @ self._x)
+        self._sy = self._y.sum(axis=0)
+        self._syy = (self._y * self._y).sum(axis=0)
+        self._sxy = (x * self._y).sum(axis=0)
+
+    def current(self):
+        """Alpha, beta and R² over the current window (NaN until it is full)."""
+
+        nan = np.full(len(self.tickers), np.nan)
+        if self.count < self.window:
+            return {"alpha": nan, "beta": nan.copy(), "r_squared": nan.copy()}
+
+        w = self.window
+        cov_xy = self._sxy - self._sx * self._sy / w
+        var_x = self._sxx - self._sx * self._sx / w
+        var_y = self._syy - self._sy * self._sy / w
+
+        beta = cov_xy / var_x
+        return {
+            "alpha": self._sy / w - beta * self._sx / w,
+            "beta": beta,
+            "r_squared": beta * cov_xy / var_y,
+        }
@@ -2,7 +2,9 @@
 
 import pandas as pd
 import numpy as np
+from analysis.panel import as_returns_panel
 from config.settings import RISK_FREE_RATE, TRADING_DAYS
+from utils.profiler import profiled
 
 class StockStatistics:
     '''calculate individual stock stats'''
@@ -11,12 +13,30 @@ class StockStatistics:
 
         self.daily_returns = daily_returns
         self.risk_free_rate = risk_free_rate
+        self.moments = None
 
+    @classmethod
+    def from_running_moments(cls, moments, risk_free_rate = RISK_FREE_RATE):
+        '''build from a RunningMoments state instead of a returns history'''
+
+        stats = cls(None, risk_free_rate)
+        stats.moments = moments
+        return stats
+
+    @profiled()
     def calculate_stats(self):
         '''annual returns, volatility, and sharpe ratio'''
 
-        annual_returns = self.daily_returns.mean() * TRADING_DAYS
-        annual_vol = self.daily_returns.std() * np.sqrt(TRADING_DAYS)
+        if self.moments is not None:
+            tickers = self.moments.tickers
+            annual_returns = pd.Series(self.moments.mean, index=tickers) * TRADING_DAYS
+            annual_vol = pd.Series(self.moments.std(), index=tickers) * np.sqrt(TRADING_DAYS)
+        else:
+            panel = as_returns_panel(self.daily_returns)
+            tickers = panel.tickers
+            annual_returns = pd.Series(panel.mean(), index=tickers) * TRADING_DAYS
+            annual_vol = pd.Series(panel.std(), index=tickers) * np.sqrt(TRADING_DAYS)
+
         sharpe_ratio = (annual_returns - self.risk_free_rate) / annual_vol
 
         stats_df = pd.DataFrame({
@@ -0,0 +1,158 @@
+"""Empirical complexity and regression reports for benchmark results.
+
+    python -m benchmarks.report benchmarks/results/abc1234.json
+    python -m benchmarks.report new.json --baseline old.json
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Timings below this are dominated by call overhead and timer noise
+MIN_SECONDS = 1e-4
+
+# Sizes timed fewer times than this are left out of the scaling fit
+MIN_RUNS = 2
+
+
+def load_results(path):
+    """Result records from a file written by benchmarks.run."""
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def _fit_exponents(frame, column):
+    '''least-squares exponents a, b of column ~ N^a T^b and the fit's R^2'''
+
+    if frame.empty:
+        return {k: np.nan for k in ("N", "T")}, np.nan
+
+    y = np.log(frame[column].to_numpy(dtype=np.float64))
+    terms = {"N": np.log(frame["n_assets"].to_numpy(dtype=np.float64)),
+             "T": np.log(frame["n_days"].to_numpy(dtype=np.float64))}
+    # A dimension with a single size carries no scaling information
+    terms = {k: v for k, v in terms.items() if np.ptp(v) > 0}
+    if not terms or len(y) <= len(terms):
+        return {k: np.nan for k in ("N", "T")}, np.nan
+
+    X = np.column_stack([np.ones_like(y), *terms.values()])
+    coef, *_ = np.linalg.lstsq(X, y, rcond=None)
+    resid = y - X @ coef
+    total = ((y - y.mean()) ** 2).sum()
+    r2 = 1 - (resid ** 2).sum() / total if total > 0 else np.nan
+
+    exponents = {"N": np.nan, "T": np.nan}
+    exponents.update(zip(terms, coef[1:]))
+    return exponents, r2
+
+
+def scaling_table(results):
+    """
+    Empirical complexity of each benchmark: fits seconds ~ N^a * T^b over
+    the measured asset counts N and history lengths T (log-log least
+    squares) and the same for peak memory. Only sizes timed at least
+    MIN_RUNS times enter the time fit, since a single call is too noisy.
+
+    Returns a DataFrame indexed by benchmark with the time exponents,
+    their R^2, the memory exponents, the number of points and the
+    slowest measured time.
+    """
+
+    frame = pd.DataFrame(results)
+    rows = {}
+    for name, group in frame.groupby("benchmark", sort=False):
+        timed = group[(group["seconds"] >= MIN_SECONDS) & (group["runs"] >= MIN_RUNS)]
+        time_exp, time_r2 = _fit_exponents(timed, "seconds")
+        sized = group[group["peak_mb"] > 0]
+        mem_exp, _ = _fit_exponents(sized, "peak_mb")
+        rows[name] = {
+            "Time ~ N^": time_exp["N"],
+            "Time ~ T^": time_exp["T"],
+            "R²": time_r2,
+            "Memory ~ N^": mem_exp["N"],
+            "Memory ~ T^": mem_exp["T"],
+            "Points": len(group),
+            "Max (s)": group["seconds"].max(),
+        }
+    table = pd.DataFrame.from_dict(rows, orient="index")
+    table.index.name = "Benchmark"
+    return table
+
+
+def compare(baseline, current, threshold=0.10):
+    """
+    Per-size comparison of two result sets. Ratio is current / baseline
+    time; rows slower by more than `threshold` are flagged "slower",
+    faster ones "faster".
+    """
+
+    keys = ["benchmark", "n_assets", "years"]
+    base = pd.DataFrame(baseline).set_index(keys)
+    new = pd.DataFrame(current).set_index(keys)
+    joined = base[["seconds", "peak_mb"]].join(
+        new[["seconds", "peak_mb"]], how="inner", lsuffix="_base", rsuffix="_new"
+    )
+
+    table = pd.DataFrame({
+        "Baseline (s)": joined["seconds_base"],
+        "Current (s)": joined["seconds_new"],
+        "Ratio": joined["seconds_new"] / joined["seconds_base"],
+        "Baseline MB": joined["peak_mb_base"],
+        "Current MB": joined["peak_mb_new"],
+    })
+    table["Change"] = np.where(
+        table["Ratio"] > 1 + threshold, "slower",
+        np.where(table["Ratio"] < 1 - threshold, "faster", ""),
+    )
+    return table
+
+
+def display_scaling(table):
+    """Print the empirical complexity table."""
+
+    print("\n" + "=" * 70)
+    print("SCALING (time ~ N^a T^b; N = assets, T = days)")
+    print("=" * 70 + "\n")
+    print(table.to_string(float_format=lambda v: f"{v:8.2f}", na_rep="-"))
+    print("=" * 70 + "\n")
+
+
+def display_comparison(table):
+    """Print a baseline comparison, noting regressions."""
+
+    print("\n" + "=" * 70)
+    print("COMPARISON WITH BASELINE")
+    print("=" * 70 + "\n")
+    print(table.to_string(float_format=lambda v: f"{v:10.4f}"))
+    slower = int((table["Change"] == "slower").sum())
+    print("-" * 70)
+    print(f"  Slower: {slower}   Faster: {int((table['Change'] == 'faster').sum())}")
+    print("=" * 70 + "\n")
+
+
+def main(argv=None):
+    """Command-line entry point; exit status 1 when a baseline comparison finds regressions."""
+
+    parser = argparse.ArgumentParser(description="Scaling report for benchmark results")
+    parser.add_argument("results")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    results = load_results(args.results)
+    display_scaling(scaling_table(results))
+    if args.baseline is None:
+        return 0
+
+    table = compare(load_results(args.baseline), results, args.threshold)
+    display_comparison(table)
+    return 1 if (table["Change"] == "slower").any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Time and memory-profile the analysis modules on synthetic panels.
+
+    python -m benchmarks.run                       # full grid, results/<commit>.json
+    python -m benchmarks.run --assets 5 50 --years 1 5
+    python -m benchmarks.run --only optimize_sharpe_qp --baseline old.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from analysis.backtest import walk_forward_backtest
+from analysis.capm import summarize_capm_table
+from analysis.covariance import ledoit_wolf, sample_covariance, statistical_factor_model
+from analysis.efficient_frontier import critical_line_frontier, efficient_frontier
+from analysis.moments import RunningMoments
+from analysis.monte_carlo import simulate_correlated_paths, simulate_stock_paths
+from analysis.optimizer import PortfolioOptimizer
+from analysis.risk import bootstrap_risk, historical_risk, simulated_risk
+from analysis.rolling import rolling_metrics
+from analysis.rolling_capm import rolling_capm
+from analysis.statistics import StockStatistics
+from benchmarks.report import compare, display_comparison, display_scaling, scaling_table
+from benchmarks.synthetic import synthetic_panel
+from utils import profiler
+
+ASSET_COUNTS = (5, 50, 500, 5000)
+YEARS = (1, 5, 10, 20)
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def _stock_statistics(panel):
+    return StockStatistics(panel["daily_returns"]).calculate_stats
+
+
+def _running_moments(panel):
+    return lambda: RunningMoments.from_returns(panel["daily_returns"])
+
+
+def _sample_covariance(panel):
+    return lambda: sample_covariance(panel["daily_returns"])
+
+
+def _ledoit_wolf(panel):
+    return lambda: ledoit_wolf(panel["daily_returns"])
+
+
+def _factor_model(panel):
+    return lambda: statistical_factor_model(panel["daily_returns"])
+
+
+def _optimizer(method):
+    def setup(panel):
+        optimizer = PortfolioOptimizer(panel["daily_returns"])
+        return lambda: optimizer.optimize_sharpe(method)
+    return setup
+
+
+def _efficient_frontier(panel):
+    returns = panel["daily_returns"]
+    mean, cov = returns.mean(), returns.cov()
+    return lambda: efficient_frontier(mean, cov, iterations=5000, seed=0)
+
+
+def _critical_line(panel):
+    returns = panel["daily_returns"]
+    mean, cov = returns.mean(), returns.cov()
+    return lambda: critical_line_frontier(mean, cov)
+
+
+def _capm_table(panel):
+    return lambda: summarize_capm_table(panel["daily_returns"], panel["market_returns"])
+
+
+def _rolling_capm(panel):
+    return lambda: rolling_capm(panel["daily_returns"], panel["market_returns"], window=60)
+
+
+def _rolling_metrics(panel):
+    # Without correlations (the default): all pairs grow as N^2
+    return lambda: rolling_metrics(panel["daily_returns"])
+
+
+def _rolling_correlation(panel):
+    return lambda: rolling_metrics(panel["daily_returns"], pairs="all")
+
+
+def _equal_weights(panel):
+    '''equal weights over the panel's tickers'''
+
+    tickers = panel["daily_returns"].columns
+    return dict(zip(tickers, np.full(len(tickers), 1 / len(tickers))))
+
+
+def _historical_risk(panel):
+    return lambda: historical_risk(panel["daily_returns"], _equal_weights(panel))
+
+
+def _bootstrap_risk(panel):
+    return lambda: bootstrap_risk(panel["daily_returns"], _equal_weights(panel), seed=0)
+
+
+def _simulated_risk(panel):
+    return lambda: simulated_risk(
+        panel["daily_returns"], _equal_weights(panel), num_simulations=20_000, seed=0
+    )
+
+
+def _stock_paths(panel):
+    returns = panel["daily_returns"].iloc[:, 0]
+    last = float(panel["historical"].iloc[-1, 0])
+    return lambda: simulate_stock_paths(last, returns, num_days=252, num_simulations=5000, seed=0)
+
+
+def _correlated_paths(panel):
+    last = panel["historical"].iloc[-1]
+    return lambda: simulate_correlated_paths(
+        last, panel["daily_returns"], num_days=252, num_simulations=1000, seed=0
+    )
+
+
+def _backtest(panel):
+    return lambda: walk_forward_backtest(panel["daily_returns"], lookback=126, method="qp")
+
+
+# name -> (setup(panel) returning the timed zero-argument call, largest
+# asset count run by default). The caps keep a full-grid run to minutes
+# on one core; --no-limits lifts them.
+BENCHMARKS = {
+    "calculate_stats": (_stock_statistics, None),
+    "running_moments": (_running_moments, None),
+    "sample_covariance": (_sample_covariance, None),
+    "ledoit_wolf": (_ledoit_wolf, None),
+    "statistical_factor_model": (_factor_model, 500),
+    "optimize_sharpe_slsqp": (_optimizer("slsqp"), 500),
+    "optimize_sharpe_qp": (_optimizer("qp"), 5000),
+    "efficient_frontier": (_efficient_frontier, 500),
+    "critical_line_frontier": (_critical_line, 500),
+    "summarize_capm_table": (_capm_table, None),
+    "rolling_capm": (_rolling_capm, None),
+    "rolling_metrics": (_rolling_metrics, 500),
+    "rolling_correlation": (_rolling_correlation, 50),
+    "historical_risk": (_historical_risk, 500),
+    "bootstrap_risk": (_bootstrap_risk, 500),
+    "simulated_risk": (_simulated_risk, 500),
+    "simulate_stock_paths": (_stock_paths, None),
+    "simulate_correlated_paths": (_correlated_paths, 500),
+    "walk_forward_backtest": (_backtest, 50),
+}
+
+
+def time_call(func, repeats=5, min_time=0.5, min_runs=2):
+    """
+    Best and median wall time of func(). One untimed warm-up call first
+    absorbs cold-start costs (lazy imports, first-touch allocations,
+    caches). Timed calls then repeat until `repeats` runs or `min_time`
+    seconds have passed, whichever comes first, but at least
+    min(min_runs, repeats) runs.
+    """
+
+    func()
+    times = []
+    total_start = time.perf_counter()
+    while len(times) < repeats:
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        if len(times) >= min_runs and time.perf_counter() - total_start >= min_time:
+            break
+    return min(times), float(np.median(times)), len(times)
+
+
+def peak_memory(func):
+    """Peak memory in MB allocated while func() runs (tracemalloc)."""
+
+    profiler.enable(memory=True)
+    try:
+        with profiler.timer("benchmark") as span:
+            func()
+    finally:
+        profiler.disable()
+        profiler.reset()
+    return span["peak_mb"]
+
+
+def run_benchmarks(names=None, assets=ASSET_COUNTS, years=YEARS, repeats=5,
+                   limits=True, seed=0, verbose=True):
+    """
+    Run the selected benchmarks on every (assets, years) panel.
+
+    Returns a list of result dicts (benchmark, n_assets, years, n_days,
+    seconds, median_seconds, runs, peak_mb). Panels are built once per
+    size and shared by all benchmarks.
+    """
+
+    names = list(names or BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {unknown}. Available: {list(BENCHMARKS)}")
+
+    results = []
+    for n_assets in assets:
+        selected = [
+            n for n in names
+            if not limits or BENCHMARKS[n][1] is None or n_assets <= BENCHMARKS[n][1]
+        ]
+        if not selected:
+            continue
+
+        for n_years in years:
+            panel = synthetic_panel(n_assets, n_years, seed=seed)
+            n_days = len(panel["daily_returns"])
+
+            for name in selected:
+                call = BENCHMARKS[name][0](panel)
+                best, median, runs = time_call(call, repeats)
+                peak = peak_memory(call)
+                results.append({
+                    "benchmark": name,
+                    "n_assets": n_assets,
+                    "years": n_years,
+                    "n_days": n_days,
+                    "seconds": best,
+                    "median_seconds": median,
+                    "runs": runs,
+                    "peak_mb": peak,
+                })
+                if verbose:
+                    print(f"  {name:28s} {n_assets:6d} assets {n_years:3d}y  "
+                          f"{best:10.4f} s  {peak:10.1f} MB", flush=True)
+            del panel
+
+    return results
+
+
+def _git_commit():
+    '''short hash of HEAD, or None outside a git checkout'''
+
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def save_results(results, path=None):
+    """Write results with machine/commit metadata as JSON; returns the path."""
+
+    commit = _git_commit()
+    now = datetime.datetime.now()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{commit or now.strftime('%Y%m%d-%H%M%S')}.json")
+
+    payload = {
+        "meta": {
+            "commit": commit,
+            "timestamp": now.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=1)
+    return path
+
+
+def main(argv=None):
+    """Command-line entry point."""
+
+    parser = argparse.ArgumentParser(description="Benchmark the analysis modules on synthetic data")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument("--assets", nargs="+", type=int, default=list(ASSET_COUNTS))
+    parser.add_argument("--years", nargs="+", type=int, default=list(YEARS))
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="timed calls per size after a warm-up; at least 2 to fit scaling")
+    parser.add_argument("--no-limits", action="store_true",
+                        help="run every benchmark at every size, ignoring the default caps")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+
+    results = run_benchmarks(args.only, args.assets, args.years, args.repeats,
+                             limits=not args.no_limits)
+    path = save_results(results, args.output)
+    print(f"\nResults written to {path}")
+
+    display_scaling(scaling_table(results))
+    if args.repeats < 2:
+        print("Scaling exponents need --repeats 2 or more; single timings are not fitted.")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        display_comparison(compare(baseline, results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
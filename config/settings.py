@@ -6,8 +6,55 @@ TICKERS = ['MSGS', 'NKE', 'DIS', 'SPOT', 'IBM']
 START_DATE = '2020-1-1'
 END_DATE = '2024-12-31'
 
+MARKET_TICKER = 'SPY'
+
+# Price source: None downloads from Yahoo Finance; a path reads local
+# CSV/Parquet files or a MemmapPriceStore directory (data/providers.py)
+PRICE_SOURCE = None
+
 RISK_FREE_RATE = 0.02
 TRADING_DAYS = 252
 
+# Monte Carlo (same seed -> identical results for any worker count)
+RANDOM_SEED = 42
+MC_WORKERS = 1
+
+# Storage precision of the large Monte Carlo, random-portfolio and rolling
+# CAPM arrays: 'float32' halves them; sums and moments stay float64
+PRECISION = 'float64'
+
+# Analysis stages run concurrently: downloads in threads, numeric stages
+# in processes (None = all CPUs)
+PIPELINE_IO_WORKERS = 4
+PIPELINE_CPU_WORKERS = None
+
+# Headless report: processes rendering figures to files (None = all CPUs)
+PLOT_WORKERS = None
+
+# Cold-start budget for importing the compute-only path (utils/import_budget.py)
+IMPORT_BUDGET_SECONDS = 1.0
+
+# Profiler (utils/profiler.py): per-function timings, optimizer counters and a
+# Chrome trace-event JSON; memory tracking (tracemalloc) slows the run down
+PROFILE = False
+PROFILE_MEMORY = False
+PROFILE_TRACE = 'profile_trace.json'
+
+# Local price cache (set USE_CACHE = False to always download)
+USE_CACHE = True
+CACHE_DIR = '.cache/prices'
+CACHE_MAX_AGE_DAYS = 1
+OFFLINE = False
+
+# Memoized pipeline stages, keyed by a hash of their inputs (LRU-bounded)
+STAGE_CACHE = True
+STAGE_CACHE_DIR = '.cache/stages'
+STAGE_CACHE_MAX_MB = 512
+
+# Analysis service (server.py): address and number of memoized query answers
+SERVICE_HOST = '127.0.0.1'
+SERVICE_PORT = 8765
+SERVICE_CACHE_SIZE = 1024
+
 pd.set_option('display.max_columns', None)
 pd.set_option('display.width', None)
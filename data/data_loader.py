@@ -1,36 +1,105 @@
 """File which handles data loading"""
 
-import yfinance as yf
-from config.settings import TICKERS, START_DATE, END_DATE
+import pandas as pd
+from analysis.panel import ReturnsPanel
+from config.settings import (
+    TICKERS, START_DATE, END_DATE, MARKET_TICKER, USE_CACHE, OFFLINE,
+)
+from data.price_cache import PriceCache
+from data.providers import YahooProvider
+from utils.profiler import profiled
 
 class DataLoader:
     """Data downloading and processing."""
 
-    def __init__(self, tickers=None, start_date=None, end_date=None):
+    def __init__(self, tickers=None, start_date=None, end_date=None,
+                 provider=None, cache=None, offline=None):
         self.tickers = tickers or TICKERS
         self.start_date = start_date or START_DATE
         self.end_date = end_date or END_DATE
+        self.provider = provider or YahooProvider()
+
+        # Only remote sources are worth caching locally
+        if cache is None and USE_CACHE and self.provider.remote:
+            cache = PriceCache()
+        self.cache = cache
+        self.offline = OFFLINE if offline is None else offline
+
+        if self.offline and self.cache is None and self.provider.remote:
+            raise ValueError("Offline mode requires a price cache or a local provider.")
 
         self.hist_data = None
+        self.panel = None
         self.daily_returns = None
         self.cumulative_returns = None
 
+    @profiled()
+    def _load_prices(self, tickers, field="Close"):
+        '''load prices through the cache, fetching only missing ranges'''
+
+        if self.cache is None:
+            frame = self.provider.fetch(tickers, self.start_date, self.end_date, field)
+            frame.index.name = "Date"
+            return frame
+
+        entries = {t: self.cache.load(t, field) for t in tickers}
+
+        if self.offline:
+            missing = [t for t, entry in entries.items() if entry is None]
+            if missing:
+                raise ValueError(f"Offline mode: no cached data for {missing}.")
+        else:
+            # Group tickers by missing range so each range is one download
+            pending = {}
+            for ticker, entry in entries.items():
+                for rng in PriceCache.missing_ranges(entry, self.start_date, self.end_date):
+                    pending.setdefault(rng, []).append(ticker)
+
+            for (start, end), group in pending.items():
+                fetched = self.provider.fetch(group, start, end, field)
+                for ticker in group:
+                    new_data = fetched[ticker] if ticker in fetched else pd.Series(dtype=float)
+                    entries[ticker] = self.cache.update(
+                        ticker, field, entries[ticker], new_data, start, end
+                    )
+
+        start = pd.Timestamp(self.start_date)
+        end = pd.Timestamp(self.end_date)
+        frame = pd.DataFrame({
+            t: PriceCache.to_series(entries[t]) for t in tickers
+        })
+        frame = frame[(frame.index >= start) & (frame.index < end)]
+        frame.index.name = "Date"
+        return frame
+
+    @profiled()
     def get_data(self):
         """Download historical price data."""
-        self.hist_data = yf.download(
-            self.tickers,
-            start=self.start_date,
-            end=self.end_date,
-        )["Close"]
+        self.hist_data = self._load_prices(self.tickers)
 
         return self.hist_data
 
+    @profiled()
+    def get_market_data(self, ticker=None):
+        """Load market index closes over the same date range."""
+        ticker = ticker or MARKET_TICKER
+
+        return self._load_prices([ticker])[ticker]
+
+    @profiled()
     def calculate_returns(self):
-        """Calculate daily and cumulative returns."""
+        """
+        Calculate daily and cumulative returns.
+
+        Returns are kept as a ReturnsPanel (self.panel): a day is only
+        dropped when no ticker has a return, and a ticker's missing days
+        stay NaN. daily_returns is a DataFrame view of the same array.
+        """
         if self.hist_data is None:
             raise ValueError("Historical data not loaded. Call get_data() first.")
 
-        self.daily_returns = self.hist_data.pct_change().dropna()
+        self.panel = ReturnsPanel.from_prices(self.hist_data)
+        self.daily_returns = self.panel.to_frame()
         self.cumulative_returns = (1 + self.daily_returns).cumprod() - 1
 
         return self.daily_returns, self.cumulative_returns
@@ -42,6 +111,7 @@ class DataLoader:
 
         return {
             "historical": self.hist_data,
+            "panel": self.panel,
             "daily_returns": self.daily_returns,
             "cumulative_returns": self.cumulative_returns,
         }
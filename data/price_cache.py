@@ -0,0 +1,171 @@
+"""Persistent on-disk cache of downloaded price series."""
+
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from config.settings import CACHE_DIR, CACHE_MAX_AGE_DAYS
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def _to_timestamp(value):
+    """Normalize a date-like value to a midnight Timestamp."""
+
+    return pd.Timestamp(value).normalize()
+
+
+class PriceCache:
+    """Columnar .npz cache of price series, one file per (ticker, field).
+
+    Each entry stores the observed dates and values together with the
+    date range [coverage_start, coverage_end) that has been fetched, so
+    that a later request only needs to download the ranges outside it.
+    """
+
+    def __init__(self, cache_dir=None, max_age_days=CACHE_MAX_AGE_DAYS):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.max_age_days = max_age_days
+
+    def _path(self, ticker, field):
+        '''file path for one cache entry'''
+
+        name = f"{_SAFE_NAME.sub('_', ticker)}__{_SAFE_NAME.sub('_', field)}.npz"
+        return os.path.join(self.cache_dir, name)
+
+    def load(self, ticker, field="Close"):
+        """Load and validate an entry. Returns a dict or None if absent."""
+
+        path = self._path(ticker, field)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as npz:
+                dates = npz["dates"].astype("datetime64[ns]")
+                values = npz["values"].astype(np.float64)
+                coverage = npz["coverage"].astype("datetime64[ns]")
+                fetched_at = float(npz["fetched_at"])
+        except (OSError, KeyError, ValueError):
+            self.evict(ticker, field)
+            return None
+
+        # Corrupt or inconsistent entries are dropped and re-fetched
+        if (
+            dates.shape != values.shape
+            or coverage.shape != (2,)
+            or coverage[0] > coverage[1]
+            or np.any(np.diff(dates.astype(np.int64)) <= 0)
+        ):
+            self.evict(ticker, field)
+            return None
+
+        entry = {
+            "dates": dates,
+            "values": values,
+            "start": pd.Timestamp(coverage[0]),
+            "end": pd.Timestamp(coverage[1]),
+            "fetched_at": fetched_at,
+        }
+        return self._trim_stale(entry)
+
+    def _trim_stale(self, entry):
+        '''drop the part of an entry fetched before its dates had closed'''
+
+        if self.max_age_days is None:
+            return entry
+
+        age_days = (time.time() - entry["fetched_at"]) / 86400
+        fetched_day = _to_timestamp(pd.Timestamp(entry["fetched_at"], unit="s"))
+
+        # Ranges reaching past the fetch day may have been incomplete when
+        # downloaded; once they are older than max_age they are re-fetched.
+        if age_days > self.max_age_days and entry["end"] > fetched_day:
+            keep = entry["dates"] < fetched_day.to_datetime64()
+            entry["dates"] = entry["dates"][keep]
+            entry["values"] = entry["values"][keep]
+            entry["end"] = max(entry["start"], fetched_day)
+
+        return entry
+
+    def save(self, ticker, field, series, start, end):
+        """Write a series covering [start, end) to the cache."""
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        series = series.dropna().sort_index()
+        series = series[~series.index.duplicated(keep="last")]
+        coverage = np.array(
+            [_to_timestamp(start).to_datetime64(), _to_timestamp(end).to_datetime64()],
+            dtype="datetime64[ns]",
+        )
+
+        path = self._path(ticker, field)
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            dates=series.index.values.astype("datetime64[ns]"),
+            values=series.to_numpy(dtype=np.float64),
+            coverage=coverage,
+            fetched_at=np.float64(time.time()),
+        )
+        os.replace(tmp_path, path)
+
+    def evict(self, ticker, field="Close"):
+        """Remove a single entry."""
+
+        path = self._path(ticker, field)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def clear(self):
+        """Remove every entry in the cache directory."""
+
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def missing_ranges(entry, start, end):
+        """Date ranges to fetch so an entry covers [start, end).
+
+        Gaps between the request and the cached range are included so the
+        cached coverage always stays one contiguous interval.
+        """
+
+        start, end = _to_timestamp(start), _to_timestamp(end)
+        if entry is None:
+            return [(start, end)]
+
+        ranges = []
+        if start < entry["start"]:
+            ranges.append((start, entry["start"]))
+        if end > entry["end"]:
+            ranges.append((entry["end"], end))
+        return ranges
+
+    @staticmethod
+    def to_series(entry, name=None):
+        """Convert an entry to a pandas Series."""
+
+        return pd.Series(entry["values"], index=pd.DatetimeIndex(entry["dates"]), name=name)
+
+    def update(self, ticker, field, entry, new_data, start, end):
+        """Merge freshly downloaded data into an entry and persist it."""
+
+        start, end = _to_timestamp(start), _to_timestamp(end)
+
+        if entry is None:
+            merged = new_data
+            cov_start, cov_end = start, end
+        else:
+            merged = pd.concat([self.to_series(entry), new_data])
+            cov_start = min(start, entry["start"])
+            cov_end = max(end, entry["end"])
+
+        self.save(ticker, field, merged, cov_start, cov_end)
+        return self.load(ticker, field)
@@ -0,0 +1,239 @@
+"""Pluggable price data sources."""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.profiler import profiled
+
+
+class DataProvider:
+    """Base class for price sources.
+
+    Subclasses implement fetch() and return a DataFrame indexed by date
+    with one column per ticker, restricted to [start, end).
+    """
+
+    # Remote providers are wrapped in the local price cache by DataLoader
+    remote = False
+
+    def fetch(self, tickers, start, end, field="Close"):
+        """Return a date x ticker DataFrame of one price field."""
+        raise NotImplementedError
+
+    @staticmethod
+    def _slice_dates(frame, start, end):
+        '''restrict a date-indexed frame to [start, end)'''
+
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        return frame[(frame.index >= start) & (frame.index < end)]
+
+
+class YahooProvider(DataProvider):
+    """Download prices from Yahoo Finance via yfinance."""
+
+    remote = True
+
+    @profiled()
+    def fetch(self, tickers, start, end, field="Close"):
+        # Imported here so local providers work without yfinance installed
+        import yfinance as yf
+
+        tickers = list(tickers)
+        data = yf.download(tickers, start=start, end=end, progress=False)[field]
+        if isinstance(data, pd.Series):
+            data = data.to_frame(name=tickers[0])
+        return data
+
+
+class LocalFileProvider(DataProvider):
+    """Read prices from local CSV or Parquet files.
+
+    `path` is either a directory holding one file per ticker
+    (<TICKER>.csv or <TICKER>.parquet with a Date column and one column
+    per field), or a single wide file with a Date column and one column
+    per ticker.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._wide = None
+
+    @staticmethod
+    def _read(path):
+        '''read a CSV/Parquet file into a date-indexed frame'''
+
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path)
+
+        if "Date" in frame.columns:
+            frame = frame.set_index("Date")
+        frame.index = pd.to_datetime(frame.index)
+        return frame.sort_index()
+
+    def _ticker_file(self, ticker):
+        '''locate the file for a ticker in directory mode'''
+
+        for ext in (".parquet", ".csv"):
+            path = os.path.join(self.path, ticker + ext)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No local price file for {ticker} in {self.path}")
+
+    @profiled()
+    def fetch(self, tickers, start, end, field="Close"):
+        tickers = list(tickers)
+
+        if os.path.isdir(self.path):
+            frame = pd.DataFrame({
+                t: self._read(self._ticker_file(t))[field] for t in tickers
+            })
+        else:
+            if self._wide is None:
+                self._wide = self._read(self.path)
+            missing = [t for t in tickers if t not in self._wide.columns]
+            if missing:
+                raise KeyError(f"Tickers not in {self.path}: {missing}")
+            frame = self._wide[tickers]
+
+        return self._slice_dates(frame, start, end)
+
+
+class MemmapPriceStore(DataProvider):
+    """Memory-mapped date x ticker array of closes.
+
+    Layout on disk:
+        prices.f64  - float64 array, shape (n_dates, n_tickers), stored
+                      column-major so each ticker's history is contiguous
+        index.json  - {"dates": [...], "tickers": [...]}
+
+    Only the pages backing the requested tickers and dates are read, so
+    universes of thousands of tickers never need to fit in RAM.
+    """
+
+    DATA_FILE = "prices.f64"
+    INDEX_FILE = "index.json"
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(os.path.join(path, self.INDEX_FILE), encoding="utf-8") as f:
+            index = json.load(f)
+
+        self.dates = pd.DatetimeIndex(pd.to_datetime(index["dates"]))
+        self.tickers = list(index["tickers"])
+        self._columns = {t: i for i, t in enumerate(self.tickers)}
+
+        self.array = np.memmap(
+            os.path.join(path, self.DATA_FILE),
+            dtype=np.float64,
+            mode="r",
+            shape=(len(self.dates), len(self.tickers)),
+            order="F",
+        )
+
+    @classmethod
+    def create(cls, path, dates, tickers, source=None, field="Close", batch_size=250):
+        """Create a store, optionally filling it from another provider.
+
+        Tickers are fetched from `source` in batches of `batch_size` and
+        written straight into the memory map; unfilled cells are NaN.
+        """
+
+        os.makedirs(path, exist_ok=True)
+        dates = pd.DatetimeIndex(dates)
+        tickers = list(tickers)
+
+        with open(os.path.join(path, cls.INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "dates": [d.strftime("%Y-%m-%d") for d in dates],
+                "tickers": tickers,
+            }, f)
+
+        array = np.memmap(
+            os.path.join(path, cls.DATA_FILE),
+            dtype=np.float64,
+            mode="w+",
+            shape=(len(dates), len(tickers)),
+            order="F",
+        )
+        array[:] = np.nan
+
+        if source is not None and len(dates):
+            end = dates[-1] + pd.Timedelta(days=1)
+            for i in range(0, len(tickers), batch_size):
+                batch = tickers[i:i + batch_size]
+                frame = source.fetch(batch, dates[0], end, field).reindex(dates)
+                array[:, i:i + len(batch)] = frame[batch].to_numpy(dtype=np.float64)
+
+        array.flush()
+        del array
+        return cls(path)
+
+    @classmethod
+    def from_frame(cls, path, frame):
+        """Create a store from an in-memory date x ticker DataFrame."""
+
+        store = cls.create(path, frame.index, frame.columns)
+        array = np.memmap(
+            os.path.join(path, cls.DATA_FILE),
+            dtype=np.float64,
+            mode="r+",
+            shape=store.array.shape,
+            order="F",
+        )
+        array[:] = frame.to_numpy(dtype=np.float64)
+        array.flush()
+        del array
+        return cls(path)
+
+    def window(self, tickers, start, end):
+        """Return (dates, array view) for tickers over [start, end).
+
+        A contiguous block of tickers is returned as a view of the memory
+        map without copying; otherwise only the selected columns are read.
+        """
+
+        lo = self.dates.searchsorted(pd.Timestamp(start), side="left")
+        hi = self.dates.searchsorted(pd.Timestamp(end), side="left")
+
+        try:
+            cols = [self._columns[t] for t in tickers]
+        except KeyError as exc:
+            raise KeyError(f"Ticker not in price store: {exc.args[0]}") from None
+
+        if cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            values = self.array[lo:hi, cols[0]:cols[0] + len(cols)]
+        else:
+            values = self.array[lo:hi][:, cols]
+
+        return self.dates[lo:hi], values
+
+    @profiled()
+    def fetch(self, tickers, start, end, field="Close"):
+        if field != "Close":
+            raise ValueError("MemmapPriceStore only holds Close prices.")
+
+        tickers = list(tickers)
+        dates, values = self.window(tickers, start, end)
+        return pd.DataFrame(np.asarray(values), index=dates, columns=tickers)
+
+
+def open_provider(source=None):
+    """
+    Provider for a price source setting: None for Yahoo Finance, a
+    MemmapPriceStore directory (one holding index.json), or a
+    LocalFileProvider directory or file.
+    """
+
+    if source is None:
+        return YahooProvider()
+    if os.path.isfile(os.path.join(source, MemmapPriceStore.INDEX_FILE)):
+        return MemmapPriceStore(source)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"No price source at {source}")
+    return LocalFileProvider(source)
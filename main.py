@@ -1,44 +1,93 @@
 """Main entry point."""
 
-import pandas as pd
+import argparse
 
-import yfinance as yf
+import pandas as pd
 
-from analysis.capm import compute_capm, compute_portfolio_beta, summarize_capm_table
-from analysis.efficient_frontier import efficient_frontier
-from analysis.monte_carlo import simulate_stock_paths
+from analysis.backtest import summarize_backtest, walk_forward_backtest
+from analysis.capm import CAPMBatch, compute_portfolio_beta
+from analysis.efficient_frontier import critical_line_frontier, efficient_frontier
+from analysis.monte_carlo import simulate_correlated_paths
 from analysis.optimizer import PortfolioOptimizer
+from analysis.risk import bootstrap_risk, historical_risk, simulated_risk
+from analysis.rolling import DEFAULT_WINDOWS, rolling_metrics
+from analysis.rolling_capm import rolling_capm
 from analysis.statistics import StockStatistics
 
+from config.settings import (
+    MC_WORKERS,
+    PIPELINE_CPU_WORKERS,
+    PIPELINE_IO_WORKERS,
+    PLOT_WORKERS,
+    PRECISION,
+    PRICE_SOURCE,
+    PROFILE,
+    PROFILE_MEMORY,
+    PROFILE_TRACE,
+    RANDOM_SEED,
+    RISK_FREE_RATE,
+)
 from data.data_loader import DataLoader
+from data.providers import open_provider
 
+from utils import profiler
 from utils.display import ResultsFormatter
+from utils.pipeline import Pipeline
+from utils.stage_cache import StageCache, get_stage_cache, set_stage_cache
 
-from visualization.capm_plots import plot_capm_regression
-from visualization.corr_plots import plot_correlation_matrix
-from visualization.efficient_frontier_plot import plot_efficient_frontier
-from visualization.monte_carlo_plots import (
-    plot_monte_carlo_distribution,
-    plot_monte_carlo_paths,
-)
-from visualization.plots import PortfolioVisualizer
+STRATEGIES = ("sharpe", "equal")
 
-def main():
-    """Main application workflow."""
+# Shortest estimation window worth backtesting, in trading days
+MIN_BACKTEST_LOOKBACK = 21
 
-    ResultsFormatter.header("PORTFOLIO ANALYSIS")
 
-    # LOAD & PROCESS DATA
-    loader = DataLoader()
-    data = loader.get_all_data()
+def parse_args(argv=None):
+    """Command-line options; with none given the program runs interactively."""
 
-    # STOCK STATISTICS
-    stock_stats = StockStatistics(data["daily_returns"])
-    stats_df = stock_stats.calculate_stats()
-    ResultsFormatter.display_stock_statistics(stats_df)
+    parser = argparse.ArgumentParser(description="Portfolio analysis report")
+    parser.add_argument(
+        "--strategy", choices=STRATEGIES,
+        help="portfolio weighting method (skips the interactive prompt)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="headless mode: write every figure to this directory instead of showing it",
+    )
+    parser.add_argument(
+        "--plot-workers", type=int, default=PLOT_WORKERS,
+        help="processes used to render figures in headless mode",
+    )
+    parser.add_argument("--tickers", nargs="+", help="tickers to analyze (default: config)")
+    parser.add_argument(
+        "--prices", default=PRICE_SOURCE,
+        help="read prices from local CSV/Parquet files or a memmap store instead of Yahoo",
+    )
+    parser.add_argument(
+        "--no-stage-cache", action="store_true",
+        help="recompute every stage instead of reusing results stored on disk",
+    )
+    parser.add_argument(
+        "--serial", action="store_true",
+        help="run the analysis stages one at a time in this process",
+    )
+    parser.add_argument(
+        "--precision", choices=("float64", "float32"), default=PRECISION,
+        help="float32 halves Monte Carlo, random-portfolio and rolling-metric arrays",
+    )
+    parser.add_argument(
+        "--profile", nargs="?", const=PROFILE_TRACE,
+        default=PROFILE_TRACE if PROFILE else None, metavar="TRACE",
+        help=f"time every stage and hot function; writes a trace (default {PROFILE_TRACE})",
+    )
+    parser.add_argument(
+        "--profile-memory", action="store_true", default=PROFILE_MEMORY,
+        help="with --profile, also record peak memory per span (slower)",
+    )
+    return parser.parse_args(argv)
 
-    # PORTFOLIO OPTIMIZATION
-    optimizer = PortfolioOptimizer(data["daily_returns"])
+
+def choose_strategy():
+    """Ask for the weighting method on stdin."""
 
     print("Select portfolio weighting method:")
     print("1. Sharpe Ratio Optimization (maximize risk-adjusted returns)")
@@ -46,44 +95,265 @@ def main():
     choice = input("Enter selection (1 or 2): ").strip()
 
     if choice == "1":
-        results = optimizer.optimize_sharpe()
-    elif choice == "2":
-        results = optimizer.equal_weight()
-    else:
-        print("Invalid choice. Using Sharpe optimization by default.")
-        results = optimizer.optimize_sharpe()
+        return "sharpe"
+    if choice == "2":
+        return "equal"
+    print("Invalid choice. Using Sharpe optimization by default.")
+    return "sharpe"
+
+
+# Pipeline stages: module-level so they can run in worker processes
+
+def load_prices(tickers, source=None):
+    """Historical closes, the returns panel, daily and cumulative returns."""
+
+    return DataLoader(tickers=tickers, provider=open_provider(source)).get_all_data()
+
+
+def load_market_returns(source=None):
+    """Daily returns of the market index."""
+
+    return DataLoader(provider=open_provider(source)).get_market_data().pct_change().dropna()
+
+
+def returns_panel(data, market_returns):
+    """Returns panel of the loaded data with the market aligned to it."""
+
+    return data["panel"].with_market(market_returns)
+
+
+def mean_of(panel):
+    """Mean daily return per ticker (cached on the panel)."""
+
+    return panel.mean_series()
+
+
+def cov_of(panel):
+    """Daily covariance matrix (cached on the panel)."""
+
+    return panel.cov_frame()
+
+
+def stock_statistics(daily_returns, risk_free_rate=RISK_FREE_RATE):
+    """Annual return / volatility / Sharpe table (cacheable stage)."""
+
+    return StockStatistics(daily_returns, risk_free_rate).calculate_stats()
+
+
+def optimize_portfolio(daily_returns, strategy, risk_free_rate=RISK_FREE_RATE):
+    """Weights and performance for the chosen strategy (cacheable stage)."""
+
+    optimizer = PortfolioOptimizer(daily_returns, risk_free_rate)
+    if strategy == "equal":
+        return optimizer.equal_weight()
+    return optimizer.optimize_sharpe()
+
+
+def backtest(panel, strategy, lookback=252):
+    """
+    Walk-forward backtest. With less history than two lookbacks the window
+    shrinks to half the complete days; below MIN_BACKTEST_LOOKBACK days
+    there is nothing to test and None is returned.
+    """
+
+    lookback = min(lookback, panel.complete().n_days // 2)
+    if lookback < MIN_BACKTEST_LOOKBACK:
+        return None
+    return walk_forward_backtest(panel, strategy, lookback=lookback)
+
+
+def rolling_report(panel, windows=DEFAULT_WINDOWS, dtype="float64"):
+    """
+    Rolling metrics for the windows that fit in the history (longer ones
+    are left out), or None when even the shortest does not.
+    """
+
+    windows = tuple(w for w in windows if w <= panel.n_days)
+    if not windows:
+        return None
+    return rolling_metrics(panel, windows, dtype=dtype)
 
+
+def monte_carlo(data, panel, results, **kwargs):
+    """Joint correlated simulation of every ticker and the portfolio."""
+
+    return simulate_correlated_paths(
+        last_prices=data["historical"].iloc[-1],
+        daily_returns=panel,
+        weights=results["weights"],
+        **kwargs
+    )
+
+
+def tail_risk_report(panel, results, levels, horizons, num_simulations, seed):
+    """Historical, block-bootstrap and Monte Carlo tail risk of each stock and the portfolio."""
+
+    weights = results["weights"]
+    return pd.concat({
+        "Historical": historical_risk(panel, weights, levels, horizons),
+        "Bootstrap": bootstrap_risk(panel, weights, levels, horizons, seed=seed),
+        "Monte Carlo": simulated_risk(
+            panel, weights, levels, horizons, num_simulations=num_simulations, seed=seed
+        ),
+    }, names=["Method"])
+
+
+def build_pipeline(tickers, strategy, cache, io_workers, cpu_workers, precision="float64",
+                   source=None):
+    """
+    Analysis stages and their dependencies. The market download runs
+    alongside the stock download, and statistics, optimization, backtests,
+    frontier, CAPM and Monte Carlo each start as soon as their inputs exist.
+    `precision` is the storage dtype of the large simulated and rolling
+    arrays and `source` the price source (see open_provider).
+    """
+
+    pipeline = Pipeline(cache, io_workers=io_workers, cpu_workers=cpu_workers)
+
+    # Downloads (the price cache already handles freshness)
+    pipeline.add("prices", load_prices, kind="io", cache=False, tickers=tickers, source=source)
+    pipeline.add("market", load_market_returns, kind="io", cache=False, source=source)
+
+    # One aligned returns panel (with the market) feeds every stage
+    pipeline.add("panel", returns_panel, ["prices", "market"], kind="inline", cache=False)
+    pipeline.add("mean_returns", mean_of, ["panel"], kind="inline", cache=False)
+    pipeline.add("cov_matrix", cov_of, ["panel"], kind="inline", cache=False)
+
+    pipeline.add("statistics", stock_statistics, ["panel"])
+    pipeline.add("optimize", optimize_portfolio, ["panel"], strategy=strategy)
+
+    # Walk-forward backtest (1y rolling window, monthly rebalance)
+    pipeline.add("backtest_sharpe", backtest, ["panel"], strategy="sharpe")
+    pipeline.add("backtest_equal", backtest, ["panel"], strategy="equal")
+
+    # Same stage name and arguments as plot_efficient_frontier uses
+    pipeline.add(
+        "random_portfolios", efficient_frontier, ["mean_returns", "cov_matrix"],
+        seed=RANDOM_SEED, dtype=precision,
+    )
+    pipeline.add("frontier", critical_line_frontier, ["mean_returns", "cov_matrix"])
+
+    pipeline.add("capm", CAPMBatch, ["panel"])
+    pipeline.add("rolling_capm", rolling_capm, ["panel"], window=60, dtype=precision)
+    pipeline.add("rolling_metrics", rolling_report, ["panel"], dtype=precision)
+
+    # VaR / CVaR / expected shortfall of the stocks and the chosen portfolio
+    pipeline.add(
+        "tail_risk", tail_risk_report, ["panel", "optimize"],
+        levels=(0.95, 0.99), horizons=(1, 10, 21), num_simulations=20_000, seed=RANDOM_SEED,
+    )
+
+    # Results do not depend on the worker count, so it is not part of the key
+    pipeline.add(
+        "monte_carlo", monte_carlo, ["prices", "panel", "optimize"], ignore=("workers",),
+        num_days=252,
+        num_simulations=5000,
+        keep_paths=200,
+        keep_terminal=True,
+        seed=RANDOM_SEED,
+        workers=MC_WORKERS,
+        dtype=precision,
+    )
+    return pipeline
+
+
+def main(argv=None):
+    """Main application workflow."""
+
+    args = parse_args(argv)
+    if args.profile is not None:
+        profiler.enable(memory=args.profile_memory)
+
+    if args.output_dir is not None:
+        # No display on servers; must happen before any figure is created
+        import matplotlib
+        matplotlib.use("Agg")
+
+    strategy = args.strategy
+    if strategy is None:
+        strategy = "sharpe" if args.output_dir is not None else choose_strategy()
+
+    # Stage results are keyed by their inputs: a rerun only recomputes the
+    # stages whose data or parameters changed
+    stages = set_stage_cache(StageCache(None) if args.no_stage_cache else get_stage_cache())
+
+    pipeline = build_pipeline(
+        args.tickers, strategy, stages,
+        io_workers=1 if args.serial else PIPELINE_IO_WORKERS,
+        cpu_workers=1 if args.serial else PIPELINE_CPU_WORKERS,
+        precision=args.precision,
+        source=args.prices,
+    )
+    out = pipeline.run()
+
+    data = out["prices"]
+    tickers = list(data["daily_returns"].columns)
+    results = out["optimize"]
+
+    ResultsFormatter.header("PORTFOLIO ANALYSIS")
+
+    # STOCK STATISTICS
+    ResultsFormatter.display_stock_statistics(out["statistics"])
+
+    # PORTFOLIO OPTIMIZATION
     ResultsFormatter.display_pf_results(results)
 
+    # WALK-FORWARD BACKTEST
+    if out["backtest_sharpe"] is None:
+        print(f"\nWalk-forward backtest skipped: fewer than {2 * MIN_BACKTEST_LOOKBACK} "
+              "complete days of history.")
+    else:
+        ResultsFormatter.display_backtest_summary(pd.DataFrame({
+            "Sharpe Ratio Optimization": summarize_backtest(out["backtest_sharpe"]),
+            "Equal Weight": summarize_backtest(out["backtest_equal"]),
+        }), lookback=out["backtest_sharpe"]["lookback"])
+
     # VISUALIZATIONS
+    # Plotting modules (matplotlib, seaborn) are imported only here, so
+    # importing main or running the analysis stages stays light
+    from visualization.capm_plots import plot_capm_regression, plot_rolling_beta
+    from visualization.corr_plots import plot_correlation_matrix
+    from visualization.efficient_frontier_plot import plot_efficient_frontier
+    from visualization.monte_carlo_plots import (
+        plot_monte_carlo_distribution,
+        plot_monte_carlo_paths,
+    )
+    from visualization.plots import PortfolioVisualizer
+    from visualization.render import FigureRenderer
+
+    # Interactive: each figure is shown as it is reached. Headless: figures
+    # are queued and written to output_dir in parallel at the end
     viz = PortfolioVisualizer()
-    viz.plot_historical_prices(data["historical"])
-    viz.plot_returns(data["daily_returns"], data["cumulative_returns"])
+    figures = FigureRenderer(args.output_dir, workers=args.plot_workers, style=viz.style)
+
+    figures.add("historical_prices", viz.plot_historical_prices, data["historical"])
+    figures.add("returns", viz.plot_returns, data["daily_returns"], data["cumulative_returns"])
 
-    plot_correlation_matrix(data["daily_returns"])
-    viz.plot_rolling_metrics(data["daily_returns"])
+    figures.add("correlation_matrix", plot_correlation_matrix, data["daily_returns"])
+    metrics = out["rolling_metrics"]
+    if metrics is None:
+        print(f"\nRolling metrics skipped: shorter than a {min(DEFAULT_WINDOWS)}-day window.")
+    else:
+        # The 60-day window, or the longest that fit a short history
+        window = 60 if 60 in metrics["windows"] else max(metrics["windows"])
+        figures.add("rolling_metrics", viz.plot_rolling_metrics, metrics, window=window)
 
     # EFFICIENT FRONTIER
-    mean_returns = data["daily_returns"].mean()
-    cov_matrix = data["daily_returns"].cov()
+    ef_results, _ = out["random_portfolios"]
+    frontier = out["frontier"]
 
-    ef_results, weight_records = efficient_frontier(mean_returns, cov_matrix)
+    ResultsFormatter.summarize_efficient_frontier(frontier, tickers)
 
-    ResultsFormatter.summarize_efficient_frontier(
-        ef_results,
-        weight_records,
-        loader.tickers
+    figures.add(
+        "efficient_frontier", plot_efficient_frontier,
+        out["mean_returns"], out["cov_matrix"], tickers, ef_results, frontier
     )
 
-    plot_efficient_frontier(mean_returns, cov_matrix, loader.tickers)
-
     # CAPM REGRESSION ANALYSIS
     ResultsFormatter.header("CAPM REGRESSION ANALYSIS")
 
-    spy = yf.download("SPY", start=loader.start_date, end=loader.end_date)["Close"]
-    market_returns = spy.pct_change().dropna()
-
-    capm_table = summarize_capm_table(data["daily_returns"], market_returns)
+    capm = out["capm"]
+    capm_table = capm.table
     ResultsFormatter.display_capm_table(capm_table)
 
     # Portfolio Beta
@@ -91,16 +361,22 @@ def main():
     pf_beta = compute_portfolio_beta(weights_series, capm_table["Beta"])
     ResultsFormatter.display_portfolio_beta(pf_beta)
 
+    # Rolling betas
+    figures.add("rolling_beta", plot_rolling_beta, out["rolling_capm"]["beta"], window=60)
+
     # Per-stock CAPM details + regression plot
-    for ticker in loader.tickers:
-        stock_ret = data["daily_returns"][ticker]
-        stats = compute_capm(stock_ret, market_returns)
+    panel = out["panel"]
+    for ticker in tickers:
+        # Days on which both the stock and the market have a return
+        stock_ret, market_ret = panel.pair(ticker)
+        stats = capm.stats(ticker)
 
         ResultsFormatter.display_capm_stats(ticker, stats)
 
-        plot_capm_regression(
+        figures.add(
+            f"capm_{ticker}", plot_capm_regression,
             stock_returns=stock_ret,
-            market_returns=market_returns,
+            market_returns=market_ret,
             ticker=ticker,
             alpha=stats["alpha"],
             beta=stats["beta"]
@@ -109,21 +385,32 @@ def main():
     # MONTE CARLO SIMULATION
     ResultsFormatter.header_monte_carlo()
 
-    for ticker in loader.tickers:
-        ResultsFormatter.mc_stock_header(ticker)
+    mc_results = out["monte_carlo"]
+    ResultsFormatter.display_mc_summary(mc_results)
+    ResultsFormatter.display_tail_risk(out["tail_risk"])
 
-        last_price = data["historical"][ticker].iloc[-1]
-        daily_ret = data["daily_returns"][ticker]
+    for i, ticker in enumerate(mc_results["tickers"]):
+        ResultsFormatter.mc_stock_header(ticker)
 
-        paths = simulate_stock_paths(
-            last_price=last_price,
-            daily_returns=daily_ret,
-            num_days=252,
-            num_simulations=5000
+        figures.add(
+            f"mc_paths_{ticker}", plot_monte_carlo_paths,
+            mc_results["sample_paths"][:, :, i], ticker,
+            bands=mc_results["bands"][:, :, i], quantiles=mc_results["quantiles"]
+        )
+        figures.add(
+            f"mc_distribution_{ticker}", plot_monte_carlo_distribution,
+            mc_results["terminal_prices"][:, i], ticker
         )
 
-        plot_monte_carlo_paths(paths, ticker)
-        plot_monte_carlo_distribution(paths, ticker)
+    if figures.headless:
+        saved = figures.run()
+        print(f"\nSaved {len(saved)} figures to {args.output_dir}")
+
+    ResultsFormatter.display_pipeline_timing(pipeline.timing())
+
+    if args.profile is not None:
+        ResultsFormatter.display_profile(profiler.summary())
+        print(f"Trace written to {profiler.write_trace(args.profile)}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,401 @@
+"""Long-running JSON analysis service with data and moments kept in memory.
+
+    python server.py                          # HTTP on SERVICE_HOST:SERVICE_PORT
+    python server.py --socket /tmp/pf.sock    # same API on a Unix socket
+    python server.py --prices prices/         # local CSV/Parquet files or memmap store
+
+POST /query with one query object or a list of them (a batch):
+
+    {"type": "optimize", "tickers": ["NKE", "IBM"], "strategy": "sharpe"}
+    {"type": "frontier", "tickers": ["NKE", "IBM", "DIS"]}
+    {"type": "capm", "weights": {"NKE": 0.6, "IBM": 0.4}}
+
+GET /health describes the loaded universe; POST /reload reloads the data.
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from analysis.capm import CAPMBatch, compute_portfolio_beta
+from analysis.efficient_frontier import critical_line_frontier
+from analysis.optimizer import PortfolioOptimizer
+from config.settings import (
+    PRICE_SOURCE,
+    RISK_FREE_RATE,
+    SERVICE_CACHE_SIZE,
+    SERVICE_HOST,
+    SERVICE_PORT,
+)
+from data.data_loader import DataLoader
+from data.providers import open_provider
+from utils.profiler import profiled
+
+QUERY_TYPES = ("optimize", "frontier", "capm")
+
+
+def _to_json(value):
+    '''numpy/pandas values as plain JSON types (NaN and inf become null)'''
+
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, pd.Series):
+        return _to_json(value.to_dict())
+    if isinstance(value, np.ndarray):
+        return _to_json(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+class AnalysisService:
+    """
+    Returns panel, daily moments and CAPM table of one universe, built once
+    and kept in memory to answer queries on any subset of its tickers.
+
+    Mean and covariance are per ticker and per pair (pairwise over the
+    observed days), and each CAPM regression only involves its own ticker,
+    so a subset's moments and betas are slices of the cached full-universe
+    arrays, identical to recomputing them from panel.subset(tickers).
+    Answers are memoized by query, and a batch computes each distinct
+    query once.
+    """
+
+    def __init__(self, panel, risk_free_rate=RISK_FREE_RATE, cache_size=SERVICE_CACHE_SIZE,
+                 loader=None):
+        self.risk_free_rate = risk_free_rate
+        self.cache_size = cache_size
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._answers = OrderedDict()
+        self._generation = 0
+        self._set_panel(panel)
+
+    @classmethod
+    def from_loader(cls, loader, **kwargs):
+        """Load prices and market returns through a DataLoader and build the service."""
+
+        return cls(cls._load(loader), loader=loader, **kwargs)
+
+    @staticmethod
+    def _load(loader):
+        '''returns panel of a loader with the market aligned to it'''
+
+        panel = loader.get_all_data()["panel"]
+        market = loader.get_market_data().pct_change().dropna()
+        return panel.with_market(market)
+
+    def _set_panel(self, panel):
+        '''compute every cached quantity of a panel, then swap them in at once'''
+
+        state = {
+            "panel": panel,
+            "mean": panel.mean(),
+            "cov": panel.cov(),
+            "capm": CAPMBatch(panel, risk_free_rate=self.risk_free_rate).table
+            if panel.market is not None else None,
+            "loaded_at": time.time(),
+        }
+        # Queries read self._state once, so they never mix old and new data
+        with self._lock:
+            self._state = state
+            self._generation += 1
+            self._answers.clear()
+
+    @property
+    def panel(self):
+        return self._state["panel"]
+
+    def reload(self):
+        """Reload the data through the loader; queries keep using the old data until done."""
+
+        if self.loader is None:
+            raise ValueError("This service was built from a panel and has no loader to reload.")
+        self._set_panel(self._load(self.loader))
+        return self.info()
+
+    def info(self):
+        """Loaded universe: tickers, date range, market availability and cache use."""
+
+        state = self._state
+        panel = state["panel"]
+        return {
+            "tickers": list(panel.tickers),
+            "n_days": panel.n_days,
+            "start": str(panel.dates[0].date()) if panel.n_days else None,
+            "end": str(panel.dates[-1].date()) if panel.n_days else None,
+            "market": panel.market is not None,
+            "loaded_at": state["loaded_at"],
+            "cached_answers": len(self._answers),
+        }
+
+    # QUERIES
+
+    @staticmethod
+    def _columns(panel, tickers):
+        '''positions of `tickers` in the panel (None = every ticker)'''
+
+        if tickers is None:
+            return np.arange(panel.n_assets)
+        tickers = list(tickers)
+        if len(set(tickers)) != len(tickers):
+            raise ValueError("Tickers must not repeat.")
+        if not tickers:
+            raise ValueError("At least one ticker is required.")
+        cols = panel.tickers.get_indexer(tickers)
+        if (cols < 0).any():
+            missing = [t for t, c in zip(tickers, cols) if c < 0]
+            raise KeyError(f"Tickers not in panel: {missing}")
+        return cols
+
+    def _moments(self, tickers):
+        '''(tickers, daily mean, daily covariance) of a subset'''
+
+        state = self._state
+        cols = self._columns(state["panel"], tickers)
+        return state["panel"].tickers[cols], state["mean"][cols], state["cov"][np.ix_(cols, cols)]
+
+    def optimize(self, tickers=None, strategy="sharpe", method="qp"):
+        """
+        Weights and performance of a subset, as PortfolioOptimizer returns
+        them. method: "qp" (active-set QP, the fast default) or "slsqp".
+        """
+
+        names, mean, cov = self._moments(tickers)
+        optimizer = PortfolioOptimizer.from_moments(mean, cov, names, self.risk_free_rate)
+        if strategy == "equal":
+            return optimizer.equal_weight()
+        if strategy != "sharpe":
+            raise ValueError(f"Unknown strategy '{strategy}'. Use 'sharpe' or 'equal'.")
+        return optimizer.optimize_sharpe(method=method)
+
+    def frontier(self, tickers=None, points_per_segment=25):
+        """
+        Exact long-only efficient frontier of a subset: the curve as
+        volatility/return/sharpe lists plus the tangency and minimum
+        volatility portfolios (weights by ticker).
+        """
+
+        names, mean, cov = self._moments(tickers)
+        result = critical_line_frontier(
+            mean, cov, self.risk_free_rate, points_per_segment=int(points_per_segment)
+        )
+
+        def _portfolio(record):
+            return dict(record, weights=dict(zip(names, record["weights"])))
+
+        volatility, returns, sharpe = result["frontier"]
+        return {
+            "frontier": {"volatility": volatility, "return": returns, "sharpe": sharpe},
+            "max_sharpe": _portfolio(result["max_sharpe"]),
+            "min_volatility": _portfolio(result["min_volatility"]),
+        }
+
+    def capm(self, tickers=None, weights=None):
+        """
+        CAPM alpha, beta, R², standard errors and t-stats per ticker, and
+        the portfolio beta when weights (ticker -> weight) are given. With
+        weights only, the tickers are the weighted ones.
+        """
+
+        state = self._state
+        table = state["capm"]
+        if table is None:
+            raise ValueError("CAPM needs market returns; the service was loaded without them.")
+        if tickers is None and weights is not None:
+            tickers = list(weights)
+
+        cols = self._columns(state["panel"], tickers)
+        result = {"stocks": table.iloc[cols].to_dict(orient="index")}
+        if weights is not None:
+            w = pd.Series(weights, dtype=np.float64)
+            self._columns(state["panel"], list(w.index))
+            result["portfolio_beta"] = compute_portfolio_beta(w, table["Beta"][w.index])
+        return result
+
+    # DISPATCH
+
+    def answer(self, query):
+        """
+        Answer one query dict {"type": ..., **parameters}. Errors come back
+        as {"error": message} so one bad query does not fail a batch.
+        """
+
+        return self.answer_batch([query])[0]
+
+    @profiled()
+    def answer_batch(self, queries):
+        """Answer a list of queries; each distinct query is computed at most once."""
+
+        keys = [json.dumps(q, sort_keys=True) if isinstance(q, dict) else None for q in queries]
+        answers = {}
+        for query, key in zip(queries, keys):
+            if key is not None and key in answers:
+                continue
+            answers[key] = self._answer_one(query, key)
+        return [answers[key] for key in keys]
+
+    def _answer_one(self, query, key):
+        '''one query, from the memo when it was answered before'''
+
+        if key is None:
+            return {"error": "A query must be a JSON object."}
+
+        with self._lock:
+            if key in self._answers:
+                self._answers.move_to_end(key)
+                return self._answers[key]
+            generation = self._generation
+
+        params = dict(query)
+        kind = params.pop("type", None)
+        if kind not in QUERY_TYPES:
+            return {"error": f"Unknown query type {kind!r}. Use one of {QUERY_TYPES}."}
+
+        try:
+            answer = _to_json(getattr(self, kind)(**params))
+        except (KeyError, ValueError, TypeError, np.linalg.LinAlgError) as exc:
+            return {"error": str(exc.args[0]) if exc.args else type(exc).__name__}
+
+        with self._lock:
+            if generation != self._generation:
+                # The data was reloaded meanwhile; do not memoize a stale answer
+                return answer
+            self._answers[key] = answer
+            while len(self._answers) > self.cache_size:
+                self._answers.popitem(last=False)
+        return answer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    '''JSON over HTTP; self.server.service is the AnalysisService'''
+
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.server.service.info())
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+
+        if self.path == "/reload":
+            try:
+                self._send(200, self.server.service.reload())
+            except ValueError as exc:
+                self._send(400, {"error": str(exc)})
+            return
+        if self.path != "/query":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        try:
+            queries = json.loads(body)
+        except ValueError:
+            self._send(400, {"error": "Request body is not valid JSON."})
+            return
+
+        service = self.server.service
+        if isinstance(queries, list):
+            self._send(200, service.answer_batch(queries))
+        else:
+            self._send(200, service.answer(queries))
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) address
+        return self.client_address[0] if self.client_address else "unix"
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    '''the HTTP API on a Unix domain socket'''
+
+    daemon_threads = True
+
+
+def make_server(service, host=SERVICE_HOST, port=SERVICE_PORT, socket_path=None, verbose=False):
+    """
+    HTTP server for `service` on host:port, or on a Unix socket when
+    socket_path is given (a stale socket file is replaced). Requests are
+    handled in threads; call serve_forever() to run it.
+    """
+
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def parse_args(argv=None):
+    """Command-line options of the service."""
+
+    parser = argparse.ArgumentParser(description="Portfolio analysis JSON service")
+    parser.add_argument("--host", default=SERVICE_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="TCP port")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--tickers", nargs="+", help="universe to load (default: config)")
+    parser.add_argument(
+        "--prices", default=PRICE_SOURCE,
+        help="read prices from local CSV/Parquet files or a memmap store instead of Yahoo",
+    )
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Load the universe once and serve queries until interrupted."""
+
+    args = parse_args(argv)
+    loader = DataLoader(tickers=args.tickers, provider=open_provider(args.prices))
+
+    start = time.perf_counter()
+    service = AnalysisService.from_loader(loader)
+    print(f"Loaded {service.panel.n_assets} tickers x {service.panel.n_days} days "
+          f"in {time.perf_counter() - start:.2f} s")
+
+    server = make_server(service, args.host, args.port, args.socket, args.verbose)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"Serving on {where} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == '__main__':
+    main()
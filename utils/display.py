@@ -46,40 +46,46 @@ class ResultsFormatter:
         print(f"  Optimization Success:    {results['optimization_success']}")
         print("=" * 70 + "\n")
 
-    # EFFICIENT FRONTIER SUMMARY
+    # BACKTEST SUMMARY
 
     @staticmethod
-    def summarize_efficient_frontier(ef_results, weight_records, tickers):
-        """Pretty-print max Sharpe & min volatility portfolios."""
+    def display_backtest_summary(summary_df, lookback=None):
+        """Display walk-forward backtest results per strategy."""
+
+        ResultsFormatter.header("WALK-FORWARD BACKTEST (OUT-OF-SAMPLE)")
+        if lookback is not None:
+            print(f"Estimation window: {lookback} trading days\n")
+        print(summary_df.to_string(float_format=lambda v: f"{v:10.4f}"))
+        print("=" * 70 + "\n")
 
-        vol_arr, ret_arr, sharpe_arr = ef_results
+    # EFFICIENT FRONTIER SUMMARY
 
-        # Max Sharpe
-        max_idx = sharpe_arr.argmax()
-        max_w = weight_records[max_idx]
+    @staticmethod
+    def summarize_efficient_frontier(frontier, tickers):
+        """Pretty-print max Sharpe & min volatility portfolios.
 
-        # Min vol
-        min_idx = vol_arr.argmin()
-        min_w = weight_records[min_idx]
+        frontier: result dict from critical_line_frontier()
+        """
 
         ResultsFormatter.header("EFFICIENT FRONTIER SUMMARY")
 
-        print("Max Sharpe Ratio Portfolio:")
-        print(f"  Expected Return:   {ret_arr[max_idx]:.4f}")
-        print(f"  Volatility:        {vol_arr[max_idx]:.4f}")
-        print(f"  Sharpe Ratio:      {sharpe_arr[max_idx]:.4f}")
-        print("\n  Weights:")
-        for t, w in zip(tickers, max_w):
-            print(f"   • {t}: {w:.2%}")
-
-        print("\nMinimum Volatility Portfolio:")
-        print(f"  Expected Return:   {ret_arr[min_idx]:.4f}")
-        print(f"  Volatility:        {vol_arr[min_idx]:.4f}")
-        print(f"  Sharpe Ratio:      {sharpe_arr[min_idx]:.4f}")
-        print("\n  Weights:")
-        for t, w in zip(tickers, min_w):
-            print(f"   • {t}: {w:.2%}")
-
+        portfolios = [
+            ("Max Sharpe Ratio Portfolio:", frontier["max_sharpe"]),
+            ("Minimum Volatility Portfolio:", frontier["min_volatility"]),
+        ]
+
+        for i, (title, pf) in enumerate(portfolios):
+            if i:
+                print()
+            print(title)
+            print(f"  Expected Return:   {pf['return']:.4f}")
+            print(f"  Volatility:        {pf['volatility']:.4f}")
+            print(f"  Sharpe Ratio:      {pf['sharpe']:.4f}")
+            print("\n  Weights:")
+            for t, w in zip(tickers, pf["weights"]):
+                print(f"   • {t}: {w:.2%}")
+
+        print(f"\n  Corner portfolios on frontier: {len(frontier['turning_points'])}")
         print("=" * 70 + "\n")
 
     # CAPM SUMMARY
@@ -106,6 +112,9 @@ class ResultsFormatter:
         print(f"  Alpha:     {stats['alpha']:.6f}")
         print(f"  Beta:      {stats['beta']:.4f}")
         print(f"  R-Squared: {stats['r_squared']:.4f}")
+        if "beta_t" in stats:
+            print(f"  t(Alpha):  {stats['alpha_t']:.4f}")
+            print(f"  t(Beta):   {stats['beta_t']:.4f}")
 
     # MONTE CARLO SUMMARY
 
@@ -120,3 +129,84 @@ class ResultsFormatter:
         """mc stock header"""
 
         print(f"Monte Carlo Simulation for {ticker}...")
+
+    @staticmethod
+    def display_mc_summary(mc_results):
+        """Display terminal price percentiles and portfolio P&L"""
+
+        print("Terminal Price Percentiles:")
+        print("-" * 70)
+        table = mc_results["terminal_quantiles"].copy()
+        table.index = [f"{q:.0%}" for q in table.index]
+        print(table.to_string(float_format=lambda v: f"{v:10.2f}"))
+
+        pf = mc_results["portfolio"]
+        if pf is not None:
+            print("\nPortfolio P&L (per $1 invested):")
+            print("-" * 70)
+            print(f"  Mean P&L:                {pf['mean_pnl']:8.4f}")
+            print(f"  Std. Dev. of P&L:        {pf['std_pnl']:8.4f}")
+            for q, pnl in pf["pnl_quantiles"].items():
+                print(f"  {q:4.0%} Percentile P&L:     {pnl:8.4f}")
+            print(f"  Probability of Loss:     {pf['prob_loss']:8.2%}")
+        print("=" * 70 + "\n")
+
+    # TAIL RISK
+
+    @staticmethod
+    def display_tail_risk(risk):
+        """Display portfolio VaR/ES by method and per-stock historical risk"""
+
+        ResultsFormatter.header("TAIL RISK (LOSS AS % OF VALUE)")
+        percent = lambda v: f"{v:10.2%}"
+
+        methods = list(risk.index.get_level_values("Method").unique())
+        portfolio = risk["Portfolio"].unstack("Method")[methods].loc[["VaR", "ES"]]
+        print("Portfolio:")
+        print("-" * 70)
+        print(portfolio.to_string(float_format=percent))
+
+        horizon = risk.index.get_level_values("Horizon").min()
+        stocks = risk.drop(columns="Portfolio").xs(
+            ("Historical", horizon), level=("Method", "Horizon")
+        ).loc[["VaR", "ES"]]
+        print(f"\nStocks ({horizon}-day, historical):")
+        print("-" * 70)
+        print(stocks.to_string(float_format=percent))
+        print("=" * 70 + "\n")
+
+    # PIPELINE TIMING
+
+    @staticmethod
+    def display_pipeline_timing(timing):
+        """Display per-stage times and the critical path"""
+
+        ResultsFormatter.header("PIPELINE TIMING")
+        table = timing["stages"].copy()
+        table["Cached"] = table["Cached"].map({True: "yes", False: ""})
+        print(table.to_string(float_format=lambda v: f"{v:8.3f}"))
+        print("-" * 70)
+        print(f"  Wall Time:               {timing['wall_time']:8.3f} s")
+        print(f"  Sum of Stage Times:      {timing['stage_time']:8.3f} s")
+        print(f"  Critical Path:           {timing['critical_path_time']:8.3f} s")
+        print(f"    {' -> '.join(timing['critical_path'])}")
+        print("=" * 70 + "\n")
+
+    # PROFILE
+
+    @staticmethod
+    def display_profile(summary, top=25):
+        """Display the slowest profiled spans with their counters"""
+
+        ResultsFormatter.header("PROFILE")
+        if summary.empty:
+            print("No profiled spans were recorded.")
+            print("=" * 70 + "\n")
+            return
+        table = summary.head(top).copy()
+        counters = table.select_dtypes("Int64").columns
+        table[counters] = table[counters].astype(object).where(table[counters].notna(), "")
+        print(table.to_string(float_format=lambda v: f"{v:10.4f}", na_rep=""))
+        if len(summary) > top:
+            print(f"  ... {len(summary) - top} more spans in the trace")
+        print("=" * 70 + "\n")
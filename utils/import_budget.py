@@ -0,0 +1,109 @@
+"""Cold-start import-time budget for the compute-only path.
+
+Run as a check (exits non-zero when over budget):
+
+    python -m utils.import_budget
+    python -m utils.import_budget --budget 0.8 analysis.optimizer
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from config.settings import IMPORT_BUDGET_SECONDS
+
+# Modules a statistics / optimizer / Monte Carlo run imports
+COMPUTE_MODULES = (
+    "main",
+    "analysis.statistics",
+    "analysis.optimizer",
+    "analysis.covariance",
+    "analysis.moments",
+    "analysis.efficient_frontier",
+    "analysis.backtest",
+    "analysis.capm",
+    "analysis.risk",
+    "analysis.rolling",
+    "analysis.rolling_capm",
+    "analysis.monte_carlo",
+    "data.data_loader",
+)
+
+# Libraries that must only load when their feature is used
+HEAVY_MODULES = (
+    "matplotlib",
+    "seaborn",
+    "statsmodels",
+    "scipy.optimize",
+    "scipy.stats",
+    "yfinance",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in sys.argv[2:]:
+    __import__(name)
+elapsed = time.perf_counter() - start
+heavy = [m for m in json.loads(sys.argv[1]) if m in sys.modules]
+print(json.dumps({"seconds": elapsed, "heavy": heavy}))
+"""
+
+
+def measure_import(modules=COMPUTE_MODULES, runs=3):
+    """
+    Import `modules` in fresh interpreters and return the best-of-`runs`
+    wall time together with any heavy libraries that got loaded.
+    """
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cmd = [sys.executable, "-c", _PROBE, json.dumps(HEAVY_MODULES), *modules]
+
+    best = None
+    for _ in range(runs):
+        out = subprocess.run(cmd, cwd=root, capture_output=True, text=True, check=True)
+        probe = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or probe["seconds"] < best["seconds"]:
+            best = probe
+    return best
+
+
+def check_import_budget(modules=COMPUTE_MODULES, budget=IMPORT_BUDGET_SECONDS, runs=3):
+    """
+    Measure the cold import of `modules` against `budget` seconds.
+
+    Returns dict(seconds, budget, heavy, ok); ok is False when the time is
+    over budget or a heavy library was imported eagerly.
+    """
+
+    probe = measure_import(modules, runs)
+    return {
+        "seconds": probe["seconds"],
+        "budget": budget,
+        "heavy": probe["heavy"],
+        "ok": probe["seconds"] <= budget and not probe["heavy"],
+    }
+
+
+def main(argv=None):
+    """Command-line check; exit status 1 when the budget is exceeded."""
+
+    parser = argparse.ArgumentParser(description="Cold-start import-time budget check")
+    parser.add_argument("modules", nargs="*", default=list(COMPUTE_MODULES))
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    result = check_import_budget(args.modules, args.budget, args.runs)
+
+    print(f"Cold import: {result['seconds']:.3f} s (budget {result['budget']:.3f} s)")
+    if result["heavy"]:
+        print(f"Heavy modules loaded eagerly: {', '.join(result['heavy'])}")
+    print("OK" if result["ok"] else "FAILED")
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
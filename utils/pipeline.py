@@ -0,0 +1,204 @@
+"""Dependency-graph executor for the analysis stages."""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+import pandas as pd
+
+from utils import profiler
+
+STAGE_KINDS = ("io", "cpu", "inline")
+
+_MISSING = object()
+
+
+def _timed(name, func, args, kwargs, parent_pid=None):
+    '''
+    run a stage and return (result, start, end, events): wall-clock times
+    and, when run in a worker process, the profiler events it recorded
+    '''
+
+    start = time.time()
+    with profiler.timer(name, "stage"):
+        result = func(*args, **kwargs)
+    end = time.time()
+    events = profiler.drain() if parent_pid not in (None, os.getpid()) else []
+    return result, start, end, events
+
+
+class Pipeline:
+    """
+    Runs named stages as soon as their dependencies have finished.
+
+    Each stage is func(*dependency_results, **kwargs). "io" stages (data
+    downloads) run in a thread pool, "cpu" stages (numeric work) in a
+    process pool and "inline" stages in the calling thread. Stages must be
+    added after their dependencies, which keeps the graph acyclic.
+
+    With a StageCache, a stage whose inputs are unchanged is loaded
+    instead of run. run() returns the results by stage name; timing()
+    reports per-stage times and the critical path.
+    """
+
+    def __init__(self, cache=None, io_workers=4, cpu_workers=None):
+        self.cache = cache
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = (os.cpu_count() or 1) if cpu_workers is None else cpu_workers
+        self._stages = {}
+        self.results = {}
+        self._timings = {}
+        self._wall = None
+
+    def add(self, name, func, deps=(), kind="cpu", cache=True, ignore=(), **kwargs):
+        """
+        Register a stage. deps are names of earlier stages whose results
+        are passed positionally; kwargs are fixed parameters. cache=False
+        always runs the stage; `ignore` names kwargs left out of its key.
+        """
+
+        if name in self._stages:
+            raise ValueError(f"Stage '{name}' is already defined.")
+        if kind not in STAGE_KINDS:
+            raise ValueError(f"Unknown stage kind '{kind}'. Use one of {STAGE_KINDS}.")
+        missing = [d for d in deps if d not in self._stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on undefined stages: {missing}")
+
+        self._stages[name] = {
+            "func": func,
+            "deps": tuple(deps),
+            "kind": kind,
+            "cache": cache,
+            "ignore": tuple(ignore),
+            "kwargs": kwargs,
+        }
+        return self
+
+    def _lookup(self, name, stage, args):
+        '''(cache key, stored result or _MISSING) for a stage'''
+
+        if self.cache is None or not stage["cache"]:
+            return None, _MISSING
+        key = self.cache.key(name, stage["func"], *args, ignore=stage["ignore"], **stage["kwargs"])
+        return key, self.cache.get(key, _MISSING)
+
+    def _finish(self, name, key, value, start, end, cached=False):
+        '''record a finished stage'''
+
+        self.results[name] = value
+        self._timings[name] = (start, end, cached)
+        if key is not None and not cached:
+            self.cache.put(key, value)
+
+    def run(self):
+        """Execute every stage; returns {stage name: result}."""
+
+        self.results, self._timings = {}, {}
+        pending = dict(self._stages)
+        running = {}
+        t0 = time.time()
+
+        cpu_executor = (
+            ProcessPoolExecutor(max_workers=self.cpu_workers)
+            if self.cpu_workers > 1 else nullcontext()
+        )
+        with ThreadPoolExecutor(max_workers=self.io_workers) as io_pool, cpu_executor as cpu_pool:
+            if cpu_pool is not None:
+                # Start the worker processes before any I/O thread exists,
+                # so they are never forked from a multi-threaded parent
+                cpu_pool.submit(int).result()
+
+            while pending or running:
+                ready = [
+                    name for name, stage in pending.items()
+                    if all(d in self.results for d in stage["deps"])
+                ]
+                for name in ready:
+                    stage = pending.pop(name)
+                    args = [self.results[d] for d in stage["deps"]]
+
+                    key, value = self._lookup(name, stage, args)
+                    if value is not _MISSING:
+                        now = time.time()
+                        self._finish(name, key, value, now, now, cached=True)
+                        continue
+
+                    pool = io_pool if stage["kind"] == "io" else cpu_pool
+                    if stage["kind"] == "inline" or pool is None:
+                        try:
+                            value, start, end, _ = _timed(name, stage["func"], args, stage["kwargs"])
+                        except Exception as exc:
+                            raise RuntimeError(f"Stage '{name}' failed: {exc}") from exc
+                        self._finish(name, key, value, start, end)
+                        continue
+
+                    future = pool.submit(
+                        _timed, name, stage["func"], args, stage["kwargs"], os.getpid()
+                    )
+                    running[future] = (name, key)
+
+                if ready or not running:
+                    # Newly finished (cached/inline) stages may unblock others
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    try:
+                        value, start, end, events = future.result()
+                    except Exception as exc:
+                        for other in running:
+                            other.cancel()
+                        raise RuntimeError(f"Stage '{name}' failed: {exc}") from exc
+                    profiler.merge(events)
+                    self._finish(name, key, value, start, end)
+
+        self._wall = (t0, time.time())
+        return self.results
+
+    def timing(self):
+        """
+        Stage timings and the critical path of the last run.
+
+        Returns dict with:
+        - stages: DataFrame of kind, start/end (seconds from launch),
+          duration and whether the result came from the cache
+        - wall_time: end-to-end seconds
+        - stage_time: sum of stage durations (the sequential cost)
+        - critical_path: longest dependency chain by duration (stage names)
+        - critical_path_time: its total duration
+        """
+
+        t0, t1 = self._wall
+        rows = {}
+        longest = {}
+        for name, stage in self._stages.items():
+            start, end, cached = self._timings[name]
+            duration = end - start
+            rows[name] = {
+                "Kind": stage["kind"],
+                "Start": start - t0,
+                "End": end - t0,
+                "Duration": duration,
+                "Cached": cached,
+            }
+
+            # Stages are stored in dependency order
+            prev = max(stage["deps"], key=lambda d: longest[d][0], default=None)
+            chain_time = duration + (longest[prev][0] if prev else 0.0)
+            chain = (longest[prev][1] if prev else []) + [name]
+            longest[name] = (chain_time, chain)
+
+        path_time, path = max(longest.values(), key=lambda item: item[0])
+        stages = pd.DataFrame.from_dict(rows, orient="index")
+        stages.index.name = "Stage"
+
+        return {
+            "stages": stages,
+            "wall_time": t1 - t0,
+            "stage_time": float(stages["Duration"].sum()),
+            "critical_path": path,
+            "critical_path_time": path_time,
+        }
@@ -0,0 +1,248 @@
+"""Lightweight timers, peak-memory tracking and counters for a run.
+
+Disabled by default. When off, a @profiled function costs one flag check
+per call and timer()/count() return immediately, so the instrumentation
+can stay in hot paths permanently.
+
+    profiler.enable(memory=True)
+    with profiler.timer("download", category="data"):
+        ...
+    profiler.count(nit=result.nit, nfev=result.nfev)
+    profiler.write_trace("trace.json")
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+class _State:
+    '''module-wide profiler state'''
+
+    enabled = False
+    memory = False
+    events = []
+    lock = threading.Lock()
+    local = threading.local()
+
+
+_state = _State()
+
+
+def enable(memory=False):
+    """Start recording. memory=True also tracks peak allocations (slower)."""
+
+    _state.enabled = True
+    _state.memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    """Stop recording (collected events are kept)."""
+
+    _state.enabled = False
+    if _state.memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state.memory = False
+
+
+def is_enabled():
+    """True while recording."""
+
+    return _state.enabled
+
+
+def reset():
+    """Drop all collected events."""
+
+    with _state.lock:
+        _state.events = []
+
+
+def drain():
+    """
+    Return and remove the events recorded by this process (used to ship
+    them from workers). Events a forked worker inherited from its parent
+    are dropped rather than returned twice.
+    """
+
+    pid = os.getpid()
+    with _state.lock:
+        events, _state.events = _state.events, []
+    return [event for event in events if event["pid"] == pid]
+
+
+def merge(events):
+    """Add events recorded in another process."""
+
+    with _state.lock:
+        _state.events.extend(events)
+
+
+def _stack():
+    '''per-thread stack of open spans'''
+
+    stack = getattr(_state.local, "stack", None)
+    if stack is None:
+        stack = _state.local.stack = []
+    return stack
+
+
+@contextmanager
+def timer(name, category="", **counters):
+    """
+    Time the enclosed block as one span. Extra keyword values (and later
+    count() calls inside the block) are stored as the span's counters.
+    """
+
+    if not _state.enabled:
+        yield None
+        return
+
+    stack = _stack()
+    span = {"name": name, "category": category, "counters": dict(counters)}
+
+    if _state.memory:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]["_abs_peak"] = max(stack[-1]["_abs_peak"], peak)
+        tracemalloc.reset_peak()
+        span["_base"] = current
+        span["_abs_peak"] = current
+
+    stack.append(span)
+    span["start"] = time.time()
+    t0 = time.perf_counter()
+    try:
+        yield span
+    finally:
+        span["duration"] = time.perf_counter() - t0
+        stack.pop()
+
+        if _state.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            span["_abs_peak"] = max(span["_abs_peak"], peak)
+            span["peak_mb"] = (span["_abs_peak"] - span["_base"]) / 2 ** 20
+            if stack:
+                stack[-1]["_abs_peak"] = max(stack[-1]["_abs_peak"], span["_abs_peak"])
+            tracemalloc.reset_peak()
+
+        event = {k: v for k, v in span.items() if not k.startswith("_")}
+        event["pid"] = os.getpid()
+        event["thread"] = threading.get_ident()
+        event["depth"] = len(stack)
+        with _state.lock:
+            _state.events.append(event)
+
+
+def count(**values):
+    """Add counters (e.g. optimizer nit/nfev) to the innermost open span."""
+
+    if not _state.enabled:
+        return
+    stack = _stack()
+    if stack:
+        counters = stack[-1]["counters"]
+        for key, value in values.items():
+            counters[key] = counters.get(key, 0) + value
+
+
+def profiled(name=None, category=None):
+    """Decorator: time every call of the function as a span."""
+
+    def decorate(func):
+        span_name = name or func.__qualname__
+        span_category = category or func.__module__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            with timer(span_name, span_category):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def events():
+    """Copy of the collected events."""
+
+    with _state.lock:
+        return list(_state.events)
+
+
+def summary():
+    """
+    Per-span totals as a DataFrame: calls, total/mean/max seconds, peak
+    memory (MB, when tracked) and summed counters, slowest first.
+    """
+
+    collected = events()
+    if not collected:
+        return pd.DataFrame(columns=["Category", "Calls", "Total (s)", "Mean (s)", "Max (s)"])
+
+    rows = []
+    for event in collected:
+        row = {"Name": event["name"], "Category": event["category"], "Duration": event["duration"]}
+        if "peak_mb" in event:
+            row["Peak MB"] = event["peak_mb"]
+        row.update(event["counters"])
+        rows.append(row)
+
+    frame = pd.DataFrame(rows)
+    counters = [c for c in frame.columns if c not in ("Name", "Category", "Duration", "Peak MB")]
+    grouped = frame.groupby("Name", sort=False)
+
+    table = pd.DataFrame({
+        "Category": grouped["Category"].first(),
+        "Calls": grouped.size(),
+        "Total (s)": grouped["Duration"].sum(),
+        "Mean (s)": grouped["Duration"].mean(),
+        "Max (s)": grouped["Duration"].max(),
+    })
+    if "Peak MB" in frame:
+        table["Peak MB"] = grouped["Peak MB"].max()
+    for column in counters:
+        total = grouped[column].sum(min_count=1)
+        if (total.dropna() % 1 == 0).all():
+            total = total.astype("Int64")
+        table[column] = total
+
+    return table.sort_values("Total (s)", ascending=False)
+
+
+def write_trace(path):
+    """
+    Write the events as JSON in the Chrome trace-event format (open in
+    chrome://tracing or Perfetto). Each span keeps its counters and peak
+    memory under "args".
+    """
+
+    trace = []
+    for event in events():
+        args = dict(event["counters"])
+        if "peak_mb" in event:
+            args["peak_mb"] = event["peak_mb"]
+        trace.append({
+            "name": event["name"],
+            "cat": event["category"],
+            "ph": "X",
+            "ts": event["start"] * 1e6,
+            "dur": event["duration"] * 1e6,
+            "pid": event["pid"],
+            "tid": event["thread"],
+            "args": args,
+        })
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f, default=float)
+    return path
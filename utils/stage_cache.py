@@ -0,0 +1,235 @@
+"""Content-addressed memoization of pipeline stages (memory + disk)."""
+
+import hashlib
+import inspect
+import os
+import pickle
+import re
+
+import numpy as np
+import pandas as pd
+from config.settings import STAGE_CACHE, STAGE_CACHE_DIR, STAGE_CACHE_MAX_MB
+
+# Bump to invalidate every stored result after an incompatible change
+CACHE_VERSION = 1
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9._-]")
+_MISSING = object()
+
+
+def _feed(h, obj):
+    '''update hash h with a canonical encoding of obj'''
+
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, bytes)):
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+    elif isinstance(obj, np.generic):
+        _feed(h, obj.item())
+    elif isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            h.update(f"objarray{obj.shape};".encode())
+            for item in obj.ravel():
+                _feed(h, item)
+        else:
+            h.update(f"array{obj.dtype.str}{obj.shape};".encode())
+            h.update(np.ascontiguousarray(obj).reshape(-1).view(np.uint8))
+    elif isinstance(obj, pd.Index):
+        h.update(b"index;")
+        _feed(h, obj.to_numpy())
+    elif isinstance(obj, pd.Series):
+        h.update(b"series;")
+        _feed(h, obj.name)
+        _feed(h, obj.index)
+        _feed(h, obj.to_numpy())
+    elif isinstance(obj, pd.DataFrame):
+        h.update(b"frame;")
+        _feed(h, obj.columns)
+        _feed(h, obj.index)
+        for column in range(obj.shape[1]):
+            _feed(h, obj.iloc[:, column].to_numpy())
+    elif isinstance(obj, (pd.Timestamp, pd.Timedelta)):
+        h.update(f"{type(obj).__name__}:{obj.isoformat()};".encode())
+    elif isinstance(obj, dict):
+        h.update(f"dict{len(obj)};".encode())
+        for key in sorted(obj, key=repr):
+            _feed(h, key)
+            _feed(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}{len(obj)};".encode())
+        for item in obj:
+            _feed(h, item)
+    elif hasattr(obj, "__dict__"):
+        # Plain objects (e.g. covariance models): public attributes only,
+        # so lazily computed private state does not change the key
+        h.update(f"obj:{type(obj).__module__}.{type(obj).__qualname__};".encode())
+        _feed(h, {k: v for k, v in vars(obj).items() if not k.startswith("_")})
+    else:
+        raise TypeError(f"Cannot fingerprint object of type {type(obj).__name__}")
+
+
+def fingerprint(*parts):
+    """Hex digest of arrays, frames and parameters (content, not identity)."""
+
+    h = hashlib.blake2b(digest_size=20)
+    for part in parts:
+        _feed(h, part)
+    return h.hexdigest()
+
+
+class StageCache:
+    """
+    Memoizes stage results keyed by a hash of the stage name and the
+    function's bound arguments (defaults included).
+
+    Results are kept in an in-process dict, so analysis and visualization
+    code share them within a run, and pickled to cache_dir so later runs
+    with unchanged inputs skip the stage. The directory is bounded to
+    max_mb; least recently used entries are evicted first. Pass
+    cache_dir=None for a memory-only cache.
+    """
+
+    def __init__(self, cache_dir=STAGE_CACHE_DIR, max_mb=STAGE_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = None if max_mb is None else int(max_mb * 1024 * 1024)
+        self._memory = {}
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, stage, func, *args, ignore=(), **kwargs):
+        """
+        Cache key for func(*args, **kwargs) run as `stage`. Arguments
+        collected by a **kwargs parameter are keyed by their own names, so
+        `ignore` applies to them as well.
+        """
+
+        signature = inspect.signature(func)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        for name, param in signature.parameters.items():
+            if param.kind is inspect.Parameter.VAR_KEYWORD:
+                arguments.update(arguments.pop(name, {}))
+        arguments = {k: v for k, v in arguments.items() if k not in ignore}
+        return f"{_SAFE_NAME.sub('_', stage)}-{fingerprint(CACHE_VERSION, stage, arguments)}"
+
+    def _path(self, key):
+        '''pickle file for a key'''
+
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def get(self, key, default=None):
+        """Stored result for key, or default."""
+
+        value = self._memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if self.cache_dir is None:
+            return default
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return default
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # Corrupt or written by incompatible code: drop it
+            self.evict(key)
+            return default
+
+        os.utime(path)  # mark as recently used
+        self._memory[key] = value
+        return value
+
+    def put(self, key, value):
+        """Store a result in memory and on disk."""
+
+        self._memory[key] = value
+        if self.cache_dir is None:
+            return
+
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._enforce_limit()
+
+    def run(self, stage, func, *args, ignore=(), **kwargs):
+        """
+        Return func(*args, **kwargs), reusing a stored result when the
+        stage's inputs are unchanged. Arguments named in `ignore` (e.g.
+        worker counts) do not affect the key.
+        """
+
+        key = self.key(stage, func, *args, ignore=ignore, **kwargs)
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = func(*args, **kwargs)
+        self.put(key, value)
+        return value
+
+    def evict(self, key):
+        """Remove one entry."""
+
+        self._memory.pop(key, None)
+        if self.cache_dir is not None and os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def clear(self):
+        """Remove every entry."""
+
+        self._memory.clear()
+        if self.cache_dir is None:
+            return
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                os.remove(entry.path)
+
+    def _enforce_limit(self):
+        '''evict least recently used files until the directory fits max_bytes'''
+
+        if self.max_bytes is None:
+            return
+
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # already evicted by another process
+            total -= size
+
+
+_default_cache = None
+
+
+def get_stage_cache():
+    """Process-wide cache shared by analysis and visualization code."""
+
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = StageCache(STAGE_CACHE_DIR if STAGE_CACHE else None)
+    return _default_cache
+
+
+def set_stage_cache(cache):
+    """Replace the process-wide cache (e.g. a memory-only one)."""
+
+    global _default_cache
+    _default_cache = cache
+    return cache
@@ -3,10 +3,18 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+from utils.profiler import profiled
+from visualization.reduction import plot_lines, scatter_or_density
+from visualization.render import finish_figure
 
-def plot_capm_regression(stock_returns, market_returns, ticker, alpha, beta, risk_free_rate=0.02):
+
+@profiled()
+def plot_capm_regression(stock_returns, market_returns, ticker, alpha, beta, risk_free_rate=0.02,
+                         save_path=None):
     """
     Plot CAPM regression: scatter of excess returns + regression line.
+    Long histories are drawn as a hexbin density instead of single points.
+    Shown on screen, or written to save_path if given.
     """
 
     rf_daily = (1 + risk_free_rate) ** (1/252) - 1
@@ -17,10 +25,10 @@ def plot_capm_regression(stock_returns, market_returns, ticker, alpha, beta, ris
     x_line = np.linspace(market_excess.min(), market_excess.max(), 200)
     y_line = alpha + beta * x_line
 
-    plt.figure(figsize=(10, 7))
+    _, ax = plt.subplots(figsize=(10, 7))
 
     # Scatter
-    plt.scatter(market_excess, stock_excess, alpha=0.5, label="Excess Returns")
+    scatter_or_density(ax, market_excess, stock_excess, alpha=0.5, label="Excess Returns")
 
     # Regression line
     plt.plot(x_line, y_line, color='red', linewidth=2,
@@ -33,5 +41,27 @@ def plot_capm_regression(stock_returns, market_returns, ticker, alpha, beta, ris
     plt.grid(alpha=0.3)
     plt.legend()
 
-    plt.tight_layout()
-    plt.show()
+    finish_figure(save_path)
+
+
+@profiled()
+def plot_rolling_beta(beta_panel, window, tickers=None, save_path=None):
+    """
+    Plot rolling CAPM betas (date x ticker panel from rolling_capm).
+    """
+
+    tickers = tickers or list(beta_panel.columns)
+
+    _, ax = plt.subplots(figsize=(14, 7))
+
+    plot_lines(ax, beta_panel[tickers], linewidth=1.5)
+
+    plt.axhline(y=1, color='black', linestyle='--', linewidth=0.8)
+
+    plt.title(f"Rolling {window}-Day CAPM Beta", fontsize=16, fontweight='bold')
+    plt.xlabel("Date")
+    plt.ylabel("Beta")
+    plt.grid(alpha=0.3)
+    plt.legend()
+
+    finish_figure(save_path)
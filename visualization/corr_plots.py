@@ -3,12 +3,14 @@
 import seaborn as sns
 import matplotlib.pyplot as plt
 
-def plot_correlation_matrix(daily_returns):
-    """plot correlation heatmap"""
+from visualization.render import finish_figure
+from utils.profiler import profiled
+
+@profiled()
+def plot_correlation_matrix(daily_returns, save_path=None):
+    """plot correlation heatmap (cell labels only for small universes)"""
 
     plt.figure(figsize=(10, 8))
-    sns.heatmap(daily_returns.corr(), annot=True, cmap="coolwarm", fmt=".2f")
+    sns.heatmap(daily_returns.corr(), annot=len(daily_returns.columns) <= 20, cmap="coolwarm", fmt=".2f")
     plt.title("Correlation Matrix of Returns", fontsize=14, fontweight="bold")
-    plt.tight_layout()
-
-    plt.show()
+    finish_figure(save_path)
@@ -2,76 +2,69 @@
 
 import numpy as np
 import matplotlib.pyplot as plt
+from analysis.covariance import as_covariance_model
+from analysis.efficient_frontier import critical_line_frontier, efficient_frontier
+from config.settings import RANDOM_SEED
+from utils.profiler import profiled
+from utils.stage_cache import get_stage_cache
+from visualization.reduction import scatter_or_density
+from visualization.render import finish_figure
+
+def generate_random_portfolios(mean_returns, cov_matrix, n_portfolios=5000, seed=RANDOM_SEED):
+    """Generate random portfolios for frontier scatter
+
+    Goes through the shared stage cache, so a sample already drawn by the
+    analysis with the same inputs is reused instead of regenerated.
+    """
 
-def compute_portfolio_stats(weights, mean_returns, cov_matrix):
-    """Return volatility, return, sharpe_ratio"""
-
-    portfolio_return = np.sum(mean_returns * weights) * 252
-    portfolio_vol = np.sqrt(np.dot(weights.T, np.dot(cov_matrix * 252, weights)))
-    sharpe_ratio = portfolio_return / portfolio_vol
-    return portfolio_vol, portfolio_return, sharpe_ratio
-
-
-def generate_random_portfolios(mean_returns, cov_matrix, n_portfolios=5000):
-    """Generate random portfolios for frontier scatter"""
-
-    n_assets = len(mean_returns)
-
-    results = np.zeros((3, n_portfolios))
-    weight_list = []
-
-    for i in range(n_portfolios):
-        weights = np.random.random(n_assets)
-        weights /= np.sum(weights)
-
-        vol, ret, sharpe = compute_portfolio_stats(weights, mean_returns, cov_matrix)
-
-        results[0, i] = vol
-        results[1, i] = ret
-        results[2, i] = sharpe
-        weight_list.append(weights)
-
-    return results, weight_list
+    return get_stage_cache().run(
+        "random_portfolios", efficient_frontier,
+        mean_returns, cov_matrix, iterations=n_portfolios, seed=seed,
+    )
 
 
-def plot_efficient_frontier(mean_returns, cov_matrix, tickers):
+@profiled()
+def plot_efficient_frontier(mean_returns, cov_matrix, tickers, ef_results=None, frontier=None,
+                            save_path=None):
     """Plots:
         - Random portfolios
         - Efficient frontier curve
         - Max Sharpe portfolio
         - Min Vol portfolio
         - Individual stock points
+
+    Pass the (3, n) results from efficient_frontier() as ef_results to
+    reuse already-sampled portfolios instead of drawing new ones, and the
+    critical_line_frontier() dict as frontier to reuse the exact solution.
+    With save_path the figure is written to file instead of shown.
+    cov_matrix may be a DataFrame, array or CovarianceModel; tickers are
+    in the order of mean_returns and cov_matrix.
     """
 
     # Random portfolios
-    results, _ = generate_random_portfolios(mean_returns, cov_matrix)
-
-    vol_arr = results[0]
-    ret_arr = results[1]
-    sharpe_arr = results[2]
-
-    # Identify special portfolios
-    max_sharpe_idx = np.argmax(sharpe_arr)
-    min_vol_idx = np.argmin(vol_arr)
+    if ef_results is None:
+        ef_results, _ = generate_random_portfolios(mean_returns, cov_matrix)
 
-    max_sharpe_point = (vol_arr[max_sharpe_idx], ret_arr[max_sharpe_idx])
-    min_vol_point = (vol_arr[min_vol_idx], ret_arr[min_vol_idx])
+    vol_arr = ef_results[0]
+    ret_arr = ef_results[1]
+    sharpe_arr = ef_results[2]
 
-    # Calculate efficient frontier curve
-    frontier_vol = np.linspace(min(vol_arr), max(vol_arr), 200)
-    frontier_ret = []
+    # Exact frontier and key portfolios
+    if frontier is None:
+        frontier = get_stage_cache().run(
+            "frontier", critical_line_frontier, mean_returns, cov_matrix
+        )
 
-    for target_vol in frontier_vol:
-        # Solve minimum return for each volatility (approximate frontier)
-        idx = (np.abs(vol_arr - target_vol)).argmin()
-        frontier_ret.append(ret_arr[idx])
+    frontier_vol, frontier_ret, _ = frontier["frontier"]
 
-    frontier_ret = np.array(frontier_ret)
+    max_sharpe_point = (frontier["max_sharpe"]["volatility"], frontier["max_sharpe"]["return"])
+    min_vol_point = (frontier["min_volatility"]["volatility"], frontier["min_volatility"]["return"])
 
-    plt.figure(figsize=(14, 9))
+    _, ax = plt.subplots(figsize=(14, 9))
 
-    scatter = plt.scatter(
-        vol_arr, ret_arr, c=sharpe_arr, cmap="viridis", s=10, alpha=0.7
+    # Large samples become a hexbin of mean Sharpe ratio
+    scatter = scatter_or_density(
+        ax, vol_arr, ret_arr, c=sharpe_arr, cmap="viridis", s=10, alpha=0.7
     )
 
     # Efficient frontier curve
@@ -83,10 +76,11 @@ def plot_efficient_frontier(mean_returns, cov_matrix, tickers):
     # Highlight minimum vol
     plt.scatter(*min_vol_point, marker='^', color='green', s=200, label="Minimum Volatility")
 
-    # Label individual stocks
-    for _, ticker in enumerate(tickers):
-        stock_vol = np.sqrt(cov_matrix[ticker][ticker] * 252)
-        stock_ret = mean_returns[ticker] * 252
+    # Label individual stocks (by position, so covariance models work too)
+    variances = as_covariance_model(cov_matrix).diag()
+    for ticker, var, mean in zip(tickers, variances, np.asarray(mean_returns)):
+        stock_vol = np.sqrt(var * 252)
+        stock_ret = mean * 252
         plt.scatter(stock_vol, stock_ret, s=120, color='blue')
         plt.text(stock_vol, stock_ret, f" {ticker}", fontsize=10)
 
@@ -99,5 +93,4 @@ def plot_efficient_frontier(mean_returns, cov_matrix, tickers):
     plt.legend()
     plt.grid(alpha=0.3)
 
-    plt.tight_layout()
-    plt.show()
+    finish_figure(save_path)
@@ -2,24 +2,48 @@
 
 import matplotlib.pyplot as plt
 
-def plot_monte_carlo_paths(price_paths, ticker):
-    """Plot multiple Monte Carlo paths for a stock."""
+from utils.profiler import profiled
+from visualization.reduction import fan_chart, percentile_bands
+from visualization.render import finish_figure
 
-    plt.figure(figsize=(12, 7))
-    plt.plot(price_paths[:200].T, alpha=0.1)   # show first 200 paths lightly
+@profiled()
+def plot_monte_carlo_paths(price_paths, ticker, bands=None,
+                           quantiles=(0.05, 0.25, 0.5, 0.75, 0.95),
+                           n_lines=10, save_path=None):
+    """Plot a percentile fan chart of Monte Carlo paths for a stock.
+
+    bands (len(quantiles) x days), e.g. from simulate_correlated_paths(),
+    are drawn directly; otherwise they are computed from price_paths
+    (simulations x days). A few sample paths are overlaid for texture.
+    """
+
+    if bands is None:
+        bands = percentile_bands(price_paths, quantiles)
+
+    _, ax = plt.subplots(figsize=(12, 7))
+    fan_chart(ax, bands, quantiles)
+
+    if price_paths is not None and n_lines:
+        ax.plot(range(1, price_paths.shape[1] + 1), price_paths[:n_lines].T,
+                color="gray", alpha=0.4, linewidth=0.8)
 
     plt.title(f"Monte Carlo Simulation — {ticker}", fontsize=16, fontweight="bold")
     plt.xlabel("Days")
     plt.ylabel("Simulated Price")
+    plt.legend(loc="upper left")
     plt.grid(alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    finish_figure(save_path)
+
 
+@profiled()
+def plot_monte_carlo_distribution(price_paths, ticker, save_path=None):
+    """Plot distribution of final simulated prices.
 
-def plot_monte_carlo_distribution(price_paths, ticker):
-    """Plot distribution of final simulated prices."""
+    Accepts either full paths (simulations x days) or a 1-D array of
+    final prices.
+    """
 
-    final_prices = price_paths[:, -1]
+    final_prices = price_paths if price_paths.ndim == 1 else price_paths[:, -1]
 
     plt.figure(figsize=(10, 6))
     plt.hist(final_prices, bins=60, alpha=0.7, color='steelblue')
@@ -28,5 +52,4 @@ def plot_monte_carlo_distribution(price_paths, ticker):
     plt.xlabel("Final Price")
     plt.ylabel("Frequency")
     plt.grid(alpha=0.3)
-    plt.tight_layout()
-    plt.show()
+    finish_figure(save_path)
@@ -1,21 +1,26 @@
 """Handle all plot functionality"""
 
 import matplotlib.pyplot as plt
-import numpy as np
+from analysis.rolling import metric_frame
+from utils.profiler import profiled
+from visualization.reduction import plot_lines
+from visualization.render import finish_figure
 
 class PortfolioVisualizer:
     '''create visualizations for PF analysis'''
 
     def __init__(self, style='seaborn-v0_8-darkgrid'):
+        self.style = style
         plt.style.use(style)
 
-    def plot_historical_prices(self, historical_data):
+    @profiled()
+    def plot_historical_prices(self, historical_data, save_path=None):
         '''plot normalized historical close prices'''
 
-        plt.figure(figsize=(14, 7))
+        _, ax = plt.subplots(figsize=(14, 7))
 
         normalized = (historical_data / historical_data.iloc[0]) * 100
-        normalized.plot(linewidth=2)
+        plot_lines(ax, normalized, linewidth=2)
 
         plt.title('Historical Price Performance (Normalized)',
                   fontsize=14, fontweight='bold')
@@ -23,16 +28,16 @@ class PortfolioVisualizer:
         plt.ylabel('Normalized Price', fontsize=12)
         plt.legend(loc='best', fontsize=10)
         plt.grid(True, alpha=0.3)
-        plt.tight_layout()
 
-        plt.show()
+        finish_figure(save_path)
 
-    def plot_returns(self, daily_returns, cumulative_returns):
-        '''plot daily and cumulative returns'''
+    @profiled()
+    def plot_returns(self, daily_returns, cumulative_returns, save_path=None):
+        '''plot daily and cumulative returns (min/max-decimated daily series)'''
 
         _, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
 
-        daily_returns.plot(ax=ax1, alpha=0.7, linewidth=1)
+        plot_lines(ax1, daily_returns, method="minmax", alpha=0.7, linewidth=1)
         ax1.set_title('Daily Returns', fontsize=14, fontweight='bold')
         ax1.set_xlabel('Date', fontsize=12)
         ax1.set_ylabel('Daily Return', fontsize=12)
@@ -40,7 +45,7 @@ class PortfolioVisualizer:
         ax1.grid(True, alpha=0.3)
         ax1.axhline(y=0, color='black', linestyle='--', linewidth=0.8)
 
-        (cumulative_returns * 100).plot(ax=ax2, linewidth=2)
+        plot_lines(ax2, cumulative_returns * 100, linewidth=2)
         ax2.set_title('Cumulative Returns', fontsize=14, fontweight='bold')
         ax2.set_xlabel('Date', fontsize=12)
         ax2.set_ylabel('Cumulative Return (%)', fontsize=12)
@@ -48,24 +53,25 @@ class PortfolioVisualizer:
         ax2.grid(True, alpha=0.3)
         ax2.axhline(y=0, color='black', linestyle='--', linewidth=0.8)
 
-        plt.tight_layout()
-        plt.show()
+        finish_figure(save_path)
 
-    def plot_rolling_metrics(self, daily_returns, window=60):
-        """Rolling volatility and rolling sharpe ratio"""
+    @profiled()
+    def plot_rolling_metrics(self, metrics, window=60, save_path=None):
+        """Rolling volatility, Sharpe ratio, downside deviation and max
+        drawdown for one window of a rolling_metrics() result"""
 
-        rolling_vol = daily_returns.rolling(window).std() * np.sqrt(252)
-        rolling_sharpe = (daily_returns.rolling(window).mean() * 252) / rolling_vol
+        _, axs = plt.subplots(2, 2, figsize=(16, 10))
 
-        _, axs = plt.subplots(2, 1, figsize=(14, 10))
+        titles = {
+            "volatility": f"Rolling {window}-Day Volatility",
+            "sharpe": f"Rolling {window}-Day Sharpe Ratio",
+            "downside_deviation": f"Rolling {window}-Day Downside Deviation",
+            "max_drawdown": f"Rolling {window}-Day Max Drawdown",
+        }
+        for ax, (name, title) in zip(axs.flat, titles.items()):
+            plot_lines(ax, metric_frame(metrics, name, window))
+            ax.set_title(title)
+            ax.legend(loc='best', fontsize=9)
+            ax.grid(True)
 
-        rolling_vol.plot(ax=axs[0])
-        axs[0].set_title(f"Rolling {window}-Day Volatility")
-        axs[0].grid(True)
-
-        rolling_sharpe.plot(ax=axs[1])
-        axs[1].set_title(f"Rolling {window}-Day Sharpe Ratio")
-        axs[1].grid(True)
-
-        plt.tight_layout()
-        plt.show()
+        finish_figure(save_path)
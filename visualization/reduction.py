@@ -0,0 +1,170 @@
+"""Reduce plot data before drawing so render time does not grow with input size"""
+
+import numpy as np
+
+# Upper bounds on what is handed to matplotlib
+MAX_LINE_POINTS = 2000
+MAX_SCATTER_POINTS = 5000
+MAX_LEGEND_ENTRIES = 20
+
+
+def lttb_indices(values, n_out=MAX_LINE_POINTS):
+    """
+    Largest-Triangle-Three-Buckets downsampling of evenly spaced series.
+
+    values is (n,) or (n, m); every column is reduced independently in the
+    same pass. Returns row indices of shape (n_out,) or (n_out, m), always
+    keeping the first and last row. NaN rows (e.g. a rolling warm-up) are
+    never preferred over real values.
+    """
+
+    y = np.asarray(values, dtype=np.float64)
+    squeeze = y.ndim == 1
+    y = y.reshape(len(y), -1)
+    n, m = y.shape
+    if n_out >= n or n_out < 3:
+        idx = np.repeat(np.arange(n)[:, None], m, axis=1)
+        return idx[:, 0] if squeeze else idx
+
+    x = np.arange(n, dtype=np.float64)
+    valid = ~np.isnan(y)
+    y_filled = np.where(valid, y, 0.0)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty((n_out, m), dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    cols = np.arange(m)
+    a = np.zeros(m, dtype=np.int64)
+
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+
+        # Average of the next bucket is the third triangle vertex
+        count = valid[nlo:nhi].sum(axis=0)
+        avg_y = y_filled[nlo:nhi].sum(axis=0) / np.maximum(count, 1)
+        avg_x = x[nlo:nhi].mean()
+
+        ax, ay = x[a], y[a, cols]
+        area = np.abs((ax - avg_x) * (y[lo:hi] - ay) - (ax - x[lo:hi, None]) * (avg_y - ay))
+        area = np.where(np.isnan(area), -1.0, area)
+
+        a = lo + np.argmax(area, axis=0)
+        out[i + 1] = a
+
+    return out[:, 0] if squeeze else out
+
+
+def minmax_indices(values, n_out=MAX_LINE_POINTS):
+    """
+    Min/max decimation: keep the lowest and highest row of each bucket.
+
+    Preserves spikes exactly, which suits noisy series such as daily
+    returns. Same input/output shapes as lttb_indices().
+    """
+
+    y = np.asarray(values, dtype=np.float64)
+    squeeze = y.ndim == 1
+    y = y.reshape(len(y), -1)
+    n, m = y.shape
+    n_buckets = n_out // 2
+    if n_buckets < 1 or n <= n_out:
+        idx = np.repeat(np.arange(n)[:, None], m, axis=1)
+        return idx[:, 0] if squeeze else idx
+
+    size = -(-n // n_buckets)
+    padded = np.full((n_buckets * size, m), np.nan)
+    padded[:n] = y
+    blocks = padded.reshape(n_buckets, size, m)
+
+    starts = (np.arange(n_buckets) * size)[:, None]
+    low = starts + np.argmin(np.where(np.isnan(blocks), np.inf, blocks), axis=1)
+    high = starts + np.argmax(np.where(np.isnan(blocks), -np.inf, blocks), axis=1)
+
+    idx = np.sort(np.concatenate([low, high]), axis=0)
+    idx = np.minimum(idx, n - 1)
+    return idx[:, 0] if squeeze else idx
+
+
+def plot_lines(ax, frame, method="lttb", max_points=MAX_LINE_POINTS, **kwargs):
+    """
+    Draw every column of a date-indexed DataFrame (or a Series) as a line
+    after reducing it to at most max_points points.
+
+    method: "lttb" for smooth series (prices, rolling metrics) or "minmax"
+    for noisy ones where extremes must stay visible (daily returns).
+    Only the first MAX_LEGEND_ENTRIES columns get a legend label.
+    """
+
+    if frame.ndim == 1:
+        frame = frame.to_frame()
+
+    reduce = lttb_indices if method == "lttb" else minmax_indices
+    values = frame.to_numpy(dtype=np.float64)
+    idx = reduce(values, max_points)
+    index = frame.index.to_numpy()
+
+    for j, column in enumerate(frame.columns):
+        rows = idx[:, j]
+        label = column if j < MAX_LEGEND_ENTRIES else "_nolegend_"
+        ax.plot(index[rows], values[rows, j], label=label, **kwargs)
+    return ax
+
+
+def scatter_or_density(ax, x, y, c=None, max_points=MAX_SCATTER_POINTS,
+                       gridsize=80, cmap="viridis", **kwargs):
+    """
+    Scatter small inputs as points; above max_points draw a hexbin density
+    (or, with c, the mean of c per hexagon) instead of every marker.
+
+    Returns the matplotlib artist, usable for a colorbar.
+    """
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    if len(x) <= max_points:
+        if c is not None:
+            kwargs["cmap"] = cmap
+        return ax.scatter(x, y, c=c, **kwargs)
+
+    kwargs.pop("s", None)
+    kwargs.pop("alpha", None)
+    if c is None:
+        kwargs.setdefault("bins", "log")
+        kwargs.setdefault("cmap", "Blues")
+    else:
+        kwargs.update(C=np.asarray(c, dtype=np.float64), reduce_C_function=np.mean, cmap=cmap)
+    return ax.hexbin(x, y, gridsize=gridsize, mincnt=1, linewidths=0, **kwargs)
+
+
+def percentile_bands(paths, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+    """Per-day percentiles of (n_paths, num_days) paths, shape (len(quantiles), num_days)."""
+
+    return np.quantile(np.asarray(paths, dtype=np.float64), quantiles, axis=0)
+
+
+def fan_chart(ax, bands, quantiles, x=None, color="steelblue"):
+    """
+    Shade symmetric percentile bands (outermost lightest) and draw the
+    median, e.g. 5-95% and 25-75% around the 50th percentile.
+    """
+
+    bands = np.asarray(bands, dtype=np.float64)
+    quantiles = np.asarray(quantiles, dtype=np.float64)
+    x = np.arange(1, bands.shape[1] + 1) if x is None else x
+
+    n_pairs = len(quantiles) // 2
+    for k in range(n_pairs):
+        low, high = k, len(quantiles) - 1 - k
+        ax.fill_between(
+            x, bands[low], bands[high], color=color,
+            alpha=0.15 + 0.5 * (k + 1) / (n_pairs + 1), linewidth=0,
+            label=f"{quantiles[low]:.0%}–{quantiles[high]:.0%}",
+        )
+
+    median = np.argmin(np.abs(quantiles - 0.5))
+    ax.plot(x, bands[median], color="black", linewidth=1.5,
+            label=f"{quantiles[median]:.0%} (median)")
+    return ax
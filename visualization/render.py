@@ -0,0 +1,103 @@
+"""Show figures interactively or write them to files in parallel"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from utils import profiler
+
+
+@profiler.profiled()
+def finish_figure(save_path=None, dpi=100):
+    """Show the current figure, or save it to save_path and close it."""
+
+    plt.tight_layout()
+    if save_path is None:
+        plt.show()
+        return
+    plt.savefig(save_path, dpi=dpi)
+    plt.close("all")
+
+
+def figure_filename(name, ext="png"):
+    '''file-system safe name for a figure (tickers may contain "/" etc.)'''
+
+    return re.sub(r"[^\w.\-^]+", "_", name) + "." + ext
+
+
+def _init_worker(style):
+    '''headless backend and shared style in every render process'''
+
+    matplotlib.use("Agg")
+    if style:
+        plt.style.use(style)
+
+
+def _render(job, parent_pid=None):
+    '''draw one queued figure; returns its path and, in a worker process, the profiler events'''
+
+    func, args, kwargs = job
+    func(*args, **kwargs)
+    events = profiler.drain() if parent_pid not in (None, os.getpid()) else []
+    return kwargs["save_path"], events
+
+
+class FigureRenderer:
+    """
+    Collects plot calls and either draws them immediately (interactive) or,
+    when output_dir is set, writes them to files in a process pool.
+
+    Queued jobs only carry the data their figure needs, so per-ticker plots
+    for hundreds of tickers render concurrently.
+    """
+
+    def __init__(self, output_dir=None, workers=None, style=None, ext="png"):
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.style = style
+        self.ext = ext
+        self.jobs = []
+
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def headless(self):
+        '''True when figures go to files instead of the screen'''
+        return self.output_dir is not None
+
+    def add(self, name, func, *args, **kwargs):
+        """Draw func(*args, **kwargs) now, or queue it to be saved as `name`."""
+
+        if not self.headless:
+            func(*args, **kwargs)
+            return
+
+        path = os.path.join(self.output_dir, figure_filename(name, ext=self.ext))
+        self.jobs.append((func, args, dict(kwargs, save_path=path)))
+
+    @profiler.profiled()
+    def run(self):
+        """Render every queued figure; returns the written paths in queue order."""
+
+        jobs, self.jobs = self.jobs, []
+        if not jobs:
+            return []
+
+        if self.workers <= 1 or len(jobs) == 1:
+            _init_worker(self.style)
+            return [_render(job)[0] for job in jobs]
+
+        chunksize = max(1, len(jobs) // (4 * self.workers))
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.style,)
+        ) as pool:
+            rendered = list(pool.map(_render, jobs, repeat(os.getpid()), chunksize=chunksize))
+
+        for _, events in rendered:
+            profiler.merge(events)
+        return [path for path, _ in rendered]